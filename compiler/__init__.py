@@ -3,8 +3,12 @@
 from __future__ import annotations
 
 import glob
+import hashlib
 import importlib
+import shutil
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Any
 
@@ -86,6 +90,73 @@ def _result_to_dict(result: _base_module.CompileResult) -> dict[str, Any]:
     }
 
 
+def prewarm_hal_archives() -> None:
+    """Fire-and-forget HAL archive builds for every family in CHIP_DB.
+
+    The HAL static library is otherwise built lazily, so the first compile
+    for a family the user has never targeted pays the full cold build.  One
+    daemon thread per family (each family archive has its own build lock and
+    manifest) brings every fast path up while the session is idle; families
+    whose HAL sources are not downloaded bail out immediately.
+
+    prewarm_hal deliberately skips set_chip/check: those regenerate the
+    shared link.ld/startup.s, and a background thread rewriting them while
+    the user's compile links against them would silently produce firmware
+    with the wrong memory layout.
+    """
+    representatives: dict[str, str] = {}
+    for chip_name, spec in _base_module.CHIP_DB.items():
+        representatives.setdefault(spec.family, chip_name)
+
+    def _build(chip: str) -> None:
+        try:
+            impl = _registry_module.get_compiler(chip)
+            impl.prewarm_hal(chip)
+        except Exception:
+            pass  # 预热失败不致命，真正编译时会报告具体错误
+
+    for chip in representatives.values():
+        threading.Thread(target=_build, args=(chip,), name="hal-prewarm", daemon=True).start()
+
+
+# Finished .bin files are kept for this long; LLM-driven retries often
+# resubmit byte-identical source, and a hit skips gcc and the linker entirely.
+_COMPILE_CACHE_TTL = 7 * 24 * 3600
+
+
+def _toolchain_id() -> str:
+    """Identify the active toolchain by resolved path plus probed version.
+
+    The bare program name is constant, so hashing it would let a toolchain
+    upgrade or PATH swap keep serving stale cached binaries for the TTL;
+    both probes below are already memoized in the base module.
+    """
+    gcc_path = _base_module._ARM_GCC_PATH
+    if not gcc_path:
+        return ""
+    version = _base_module._probe_gcc_version(gcc_path) or ""
+    return f"{gcc_path}\x00{version}"
+
+
+def _compile_cache_path(code: str, chip_name: str) -> Path:
+    """Return the cached firmware path for a (source, chip, toolchain) triple."""
+    digest = hashlib.sha256(
+        f"{chip_name}\x00{_toolchain_id()}\x00{code}".encode()
+    ).hexdigest()
+    return _base_module.BUILD_DIR / ".compile_cache" / f"{digest}.bin"
+
+
+def _prune_compile_cache(cache_dir: Path) -> None:
+    """Drop cached binaries that have not been touched within the TTL."""
+    cutoff = time.time() - _COMPILE_CACHE_TTL
+    try:
+        for entry in cache_dir.iterdir():
+            if entry.suffix == ".bin" and entry.stat().st_mtime < cutoff:
+                entry.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
 class Compiler:
     """Legacy-compatible compiler facade used by `stm32_agent.py`."""
 
@@ -112,7 +183,9 @@ class Compiler:
         self.has_hal_lib = self._impl.has_hal_lib
         self.hal_inc_dirs = list(self._impl.hal_inc_dirs)
         self.hal_src_files = list(self._impl.hal_src_files)
-        self._chip_info = dict(self._impl._chip_info) if self._impl._chip_info else None
+        self._chip_info = (
+            self._impl._chip_info._asdict() if self._impl._chip_info is not None else None
+        )
         self._current_family = self._impl._current_family
 
     def _ensure_impl(self, chip_name: str | None = None) -> _base_module.ChipCompiler:
@@ -150,18 +223,54 @@ class Compiler:
         return result
 
     def compile(self, code: str) -> dict[str, Any]:
-        """Compile a complete bare-metal `main.c` source string."""
-        source_path = _base_module.BUILD_DIR / "main.c"
-        source_path.write_text(code, encoding="utf-8")
+        """Compile a complete bare-metal `main.c` source string.
+
+        Byte-identical source for the same chip short-circuits to a cached
+        firmware image without launching gcc at all.
+        """
+        cached = _compile_cache_path(code, self._chip_name)
+        if cached.exists():
+            cached.touch()
+            return {
+                "ok": True,
+                "msg": f"编译成功（缓存命中，{cached.stat().st_size}B）",
+                "bin_path": str(cached),
+                "bin_size": cached.stat().st_size,
+            }
+
+        source_path = _base_module.RUNTIME_BUILD_DIR / "main.c"
+        source_path.parent.mkdir(parents=True, exist_ok=True)
+        # Identical source skips the rewrite so mtime-based caches stay warm.
+        _base_module._write_if_changed(source_path, code)
         impl = self._ensure_impl(self._chip_name)
         result = impl.compile(source_path, self._chip_name)
         self._sync_public_state()
+        if result.success and result.bin_path:
+            try:
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(result.bin_path, cached)
+                _prune_compile_cache(cached.parent)
+            except OSError:
+                pass
         return _result_to_dict(result)
 
+    async def compile_async(self, code: str) -> dict[str, Any]:
+        """Async wrapper around :meth:`compile` for event-loop callers.
+
+        The blocking work (gcc children) already releases the GIL while it
+        waits, so a worker thread is enough to keep an event loop responsive;
+        results are shared with the synchronous cache.
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.compile, code)
+
     def compile_rtos(self, code: str) -> dict[str, Any]:
         """Compile a complete `main.c` source string with FreeRTOS."""
-        source_path = _base_module.BUILD_DIR / "main.c"
-        source_path.write_text(code, encoding="utf-8")
+        source_path = _base_module.RUNTIME_BUILD_DIR / "main.c"
+        source_path.parent.mkdir(parents=True, exist_ok=True)
+        # Identical source skips the rewrite so mtime-based caches stay warm.
+        _base_module._write_if_changed(source_path, code)
         impl = self._ensure_impl(self._chip_name)
         result = impl.compile_rtos(source_path, self._chip_name)
         self._sync_public_state()
@@ -187,6 +296,7 @@ __all__ = [
     "get_compiler",
     "get_package_mtime",
     "lookup_chip",
+    "prewarm_hal_archives",
     "register",
     "reload_package",
 ]
@@ -7,7 +7,9 @@ STM32 Agent 配置文件（云端优先）
 3. 下面保留的少量“单机遗留参数”仅用于兼容旧版 stm32_agent.py 参考运行。
 """
 
+import atexit
 import os
+import shutil
 from pathlib import Path
 
 # ================= 网络代理 =================
@@ -45,6 +47,11 @@ ARM_GCC = "arm-none-eabi-gcc"
 ARM_OBJCOPY = "arm-none-eabi-objcopy"
 ARM_AR = "arm-none-eabi-ar"
 ARM_SIZE = "arm-none-eabi-size"
+# 编译缓存包装器（存在时自动启用，重复编译相同源码可秒回）
+CCACHE = shutil.which("ccache") or shutil.which("sccache")
+# ELF→BIN 转换优先用 llvm-objcopy（比 binutils objcopy 快数倍）；
+# 设为 False 强制使用 arm-none-eabi-objcopy
+FAST_BIN_OUTPUT = True
 
 # ================= 目录结构 =================
 BASE_DIR = Path(__file__).parent
@@ -54,6 +61,14 @@ PROJECTS_DIR = WORKSPACE / "projects"
 HAL_DIR = WORKSPACE / "hal"
 RTOS_DIR = WORKSPACE / "rtos"
 
+# 临时编译产物目录：有 tmpfs 时走内存盘，避免每次编译往 SD/eMMC 写
+# main.c / firmware.elf（最终 .bin 与 HAL 静态库仍落在 BUILD_DIR）
+if Path("/dev/shm").is_dir():
+    RUNTIME_BUILD_DIR = Path(f"/dev/shm/garycli_build_{os.getpid()}")
+    atexit.register(shutil.rmtree, RUNTIME_BUILD_DIR, ignore_errors=True)
+else:
+    RUNTIME_BUILD_DIR = BUILD_DIR
+
 # ================= 调试参数 =================
 MAX_DEBUG_ATTEMPTS = 5
 REGISTER_READ_DELAY = 0.3  # 读寄存器前等待时间（秒）
@@ -1,7 +1,7 @@
 """Gary core runtime, agent loop, and CLI orchestration."""
 
 import argparse
-import sys, os, json, re, time, subprocess
+import sys, os, json, re, time, threading, subprocess
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Any, Callable
@@ -414,26 +414,52 @@ def _reg_map(family: str) -> dict:
 MAX_DEBUG_ATTEMPTS = 8  # 提高上限，一个任务最多 8 轮（含修改迭代）
 
 
+_COMPILER_LOCK = threading.Lock()
+
+
 def _get_compiler() -> Compiler:
     """返回 Compiler 单例；若 compiler/ 包文件已更新则自动热重载。"""
     ctx = get_context()
     import importlib
 
-    try:
-        mtime = _compiler_module.get_package_mtime()
-    except Exception:
-        mtime = 0.0
-    if mtime > ctx.compiler_mtime:
-        globals()["_compiler_module"] = importlib.reload(_compiler_module)
-        if hasattr(_compiler_module, "reload_package"):
-            _compiler_module.reload_package()
-        globals()["Compiler"] = _compiler_module.Compiler
-        ctx.compiler = None  # 旧实例作废，下方重新创建
-        ctx.compiler_mtime = mtime
-    if ctx.compiler is None:
-        ctx.compiler = _compiler_module.Compiler()
-        ctx.compiler.check(ctx.chip)  # 探测 GCC/HAL，设置 has_gcc/has_hal
-    return ctx.compiler
+    # 加锁：后台预热线程与首个编译请求可能同时初始化单例
+    with _COMPILER_LOCK:
+        try:
+            mtime = _compiler_module.get_package_mtime()
+        except Exception:
+            mtime = 0.0
+        if mtime > ctx.compiler_mtime:
+            globals()["_compiler_module"] = importlib.reload(_compiler_module)
+            if hasattr(_compiler_module, "reload_package"):
+                _compiler_module.reload_package()
+            globals()["Compiler"] = _compiler_module.Compiler
+            ctx.compiler = None  # 旧实例作废，下方重新创建
+            ctx.compiler_mtime = mtime
+        if ctx.compiler is None:
+            ctx.compiler = _compiler_module.Compiler()
+            ctx.compiler.check(ctx.chip)  # 探测 GCC/HAL，设置 has_gcc/has_hal
+        return ctx.compiler
+
+
+def _warm_compiler_async() -> None:
+    """后台预热编译器：交互会话启动时提前做工具链探测和 HAL 预编译。
+
+    没有常驻服务进程可言——Gary 是单进程 CLI，编译器单例本身就是
+    "常驻 worker"。这里把首次 check()（gcc 探测 + HAL 扫描 + 启动文件
+    生成）和 HAL 静态库预编译挪到后台线程，在用户输入第一条指令的
+    空档完成，首次编译即走热路径。
+    """
+
+    def _warm() -> None:
+        try:
+            compiler = _get_compiler()
+            compiler.precompile_hal()
+            # 当前芯片就绪后，再后台补齐其它家族的 HAL 静态库
+            _compiler_module.prewarm_hal_archives()
+        except Exception:
+            pass  # 预热失败不致命，首次编译时会重新报告具体错误
+
+    threading.Thread(target=_warm, name="compiler-warmup", daemon=True).start()
 
 
 def _get_bridge() -> PyOCDBridge:
@@ -3636,6 +3662,8 @@ def run(args: argparse.Namespace) -> None:
     if getattr(args, "connect", False):
         stm32_connect(chip_arg or None)
 
+    # 交互模式下趁用户输入的空档预热编译器（oneshot 会立刻编译，不预热以免并发冲突）
+    _warm_compiler_async()
     agent = STM32Agent()
     agent.run()
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sys, os, json, re, shutil, subprocess, importlib, importlib.util, zipfile, hashlib
 import time, traceback
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass, field, asdict
@@ -21,22 +22,105 @@ REQUIRED_FILES = ["skill.json", "tools.py", "schemas.json"]
 # skill.json 的 schema 版本
 SKILL_SCHEMA_VERSION = "1.0"
 
-# 尝试导入 rich
+# 可选的流式 JSON 解析（大 schemas.json 时省一半峰值内存）
 try:
-    from rich.console import Console
-    from rich.table import Table
-    from rich import box
-
-    CONSOLE = Console()
+    import ijson
 except ImportError:
+    ijson = None
+
+# 字符类写法不回溯，且只在模块加载时编译一次
+_RICH_TAG_RE = re.compile(r"\[[^\]]*\]")
+
+
+class _FC:
+    """rich 不可用时的纯文本后备控制台"""
+
+    def print(self, *a, **kw):
+        text = str(a[0]) if a else ""
+        print(_RICH_TAG_RE.sub("", text))
+
+
+class _LazyConsole:
+    """首次 print 时才导入 rich 并实例化 Console。
+
+    很多调用路径（工具直接返回 dict 的 skill_list/skill_info 等）从不
+    打印，rich 又要拉起几十个子模块，把这笔导入成本挪出冷启动。
+    """
+
+    _real = None
+
+    def _console(self):
+        if _LazyConsole._real is None:
+            try:
+                from rich.console import Console
+
+                _LazyConsole._real = Console()
+            except ImportError:
+                _LazyConsole._real = _FC()
+        return _LazyConsole._real
+
+    def print(self, *a, **kw):
+        self._console().print(*a, **kw)
+
+
+CONSOLE = _LazyConsole()
+
 
-    class _FC:
-        def print(self, *a, **kw):
-            text = str(a[0]) if a else ""
-            text = re.sub(r"\[.*?\]", "", text)
-            print(text)
+# ─────────────────────────────────────────────────────────────
+# skill.json 解析缓存
+# ─────────────────────────────────────────────────────────────
+
+# (mtime, size) 没变就复用已解析的 dict；load_all/list/registry 各自
+# 重复解析同一批 skill.json，缓存后热路径只剩一次 stat + 字典查找
+_META_CACHE: Dict[Path, Tuple[float, int, dict]] = {}
+
+
+# 各写盘点共用一个 encoder，免得每次 dumps 都重建一遍
+_JSON_ENCODE = json.JSONEncoder(indent=2, ensure_ascii=False).encode
 
-    CONSOLE = _FC()
+
+def _read_json(path: Path) -> Any:
+    """读取并解析 JSON 文件（read_bytes 绕开 TextIOWrapper 的额外 syscall）"""
+    return json.loads(path.read_bytes())
+
+
+def _read_utf8(path: Path) -> str:
+    """读取 UTF-8 文本文件（同上，直接 read_bytes 后解码）"""
+    return path.read_bytes().decode("utf-8")
+
+
+def _scan_skill_dirs(root: Path) -> List[Path]:
+    """列出 root 下的技能目录（含免解压的 .zip 技能包）。
+
+    一次 scandir 就拿到 readdir 缓存的类型信息，免去对每个子项再
+    stat 一次（iterdir + is_dir 的写法每项两个 syscall）。
+    """
+    try:
+        with os.scandir(root) as it:
+            return sorted(
+                Path(entry.path)
+                for entry in it
+                if not entry.name.startswith("_")
+                and (entry.is_dir(follow_symlinks=False) or entry.name.endswith(".zip"))
+            )
+    except OSError:
+        return []
+
+
+def _read_meta(path: Path) -> dict:
+    """读取并解析 skill.json（带 mtime/size 缓存）"""
+    st = path.stat()
+    cached = _META_CACHE.get(path)
+    if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        return dict(cached[2])
+    data = _read_json(path)
+    _META_CACHE[path] = (st.st_mtime, st.st_size, data)
+    return dict(data)
+
+
+def _invalidate_meta(path: Path) -> None:
+    """skill.json 被写入/移动后作废对应缓存项"""
+    _META_CACHE.pop(path, None)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -44,7 +128,7 @@ except ImportError:
 # ─────────────────────────────────────────────────────────────
 
 
-@dataclass
+@dataclass(slots=True)
 class SkillMeta:
     """skill.json 对应的数据结构"""
 
@@ -66,11 +150,14 @@ class SkillMeta:
     # 运行时
     tools_count: int = 0
     load_error: str = ""
+    # enabled and not load_error 的预计算结果，合并热循环只读这一个槽位
+    _active: bool = False
 
     @classmethod
     def from_dict(cls, d: dict) -> "SkillMeta":
         known = {f.name for f in cls.__dataclass_fields__.values()}
-        filtered = {k: v for k, v in d.items() if k in known}
+        # 下划线字段是运行时派生值，不从序列化数据恢复
+        filtered = {k: v for k, v in d.items() if k in known and not k.startswith("_")}
         return cls(**filtered)
 
     def to_dict(self) -> dict:
@@ -82,7 +169,7 @@ class SkillMeta:
 # ─────────────────────────────────────────────────────────────
 
 
-@dataclass
+@dataclass(slots=True)
 class LoadedSkill:
     """一个已加载的 skill 实例"""
 
@@ -94,6 +181,50 @@ class LoadedSkill:
     module: Any = None  # Python module 对象
 
 
+def _zip_prefix(names: set) -> str:
+    """zip 成员的公共顶层目录前缀（没有则返回空串）"""
+    tops = {n.split("/", 1)[0] for n in names}
+    if names and len(tops) == 1 and all("/" in n for n in names):
+        return tops.pop() + "/"
+    return ""
+
+
+class _ZipToolsLoader:
+    """从 .zip 技能包内直接 exec tools.py 的内存加载器（免解压）"""
+
+    def __init__(self, zip_path: Path, arcname: str):
+        self.zip_path = zip_path
+        self.arcname = arcname
+
+    def create_module(self, spec):
+        return None
+
+    def get_source(self, fullname):
+        with zipfile.ZipFile(str(self.zip_path)) as zf:
+            return zf.read(self.arcname).decode("utf-8")
+
+    def exec_module(self, module):
+        source = self.get_source(module.__name__)
+        exec(compile(source, f"{self.zip_path}/{self.arcname}", "exec"), module.__dict__)
+
+
+def _extract_tools_map(module: Any) -> Dict[str, Any]:
+    """从已 exec 的模块提取工具表"""
+    # 优先从 module.TOOLS_MAP 获取，否则扫描所有 public 函数
+    if hasattr(module, "TOOLS_MAP") and isinstance(module.TOOLS_MAP, dict):
+        return dict(module.TOOLS_MAP)
+    if hasattr(module, "EXTRA_TOOLS_MAP") and isinstance(module.EXTRA_TOOLS_MAP, dict):
+        return dict(module.EXTRA_TOOLS_MAP)
+    # 自动发现：所有不以 _ 开头的可调用对象
+    # vars() 直接遍历模块 __dict__，省掉 dir() 的排序和每个名字
+    # 三次 getattr 的描述符查找
+    return {
+        name: obj
+        for name, obj in vars(module).items()
+        if not name.startswith("_") and callable(obj) and not isinstance(obj, type)
+    }
+
+
 def _load_skill_module(skill_dir: Path) -> Tuple[Optional[Any], str]:
     """动态加载 skill 的 tools.py 模块"""
     tools_py = skill_dir / "tools.py"
@@ -102,24 +233,59 @@ def _load_skill_module(skill_dir: Path) -> Tuple[Optional[Any], str]:
 
     module_name = f"gary_skill_{skill_dir.name}"
     try:
+        # tools.py 没改过就直接复用已 exec 的模块，重载时省掉 exec_module
+        mtime_ns = tools_py.stat().st_mtime_ns
+        cached = sys.modules.get(module_name)
+        if cached is not None and getattr(cached, "__gary_mtime__", None) == mtime_ns:
+            return cached, ""
         spec = importlib.util.spec_from_file_location(module_name, str(tools_py))
         if spec is None or spec.loader is None:
             return None, f"无法创建模块 spec: {tools_py}"
         module = importlib.util.module_from_spec(spec)
         sys.modules[module_name] = module
         spec.loader.exec_module(module)
+        module.__gary_mtime__ = mtime_ns
         return module, ""
     except Exception as e:
         return None, f"加载 tools.py 失败: {e}\n{traceback.format_exc()}"
 
 
+# schemas.json 超过这个体积才值得走流式解析（小文件流式反而更慢）
+_STREAM_SCHEMA_MIN_BYTES = 64 * 1024
+
+# 这些扩展名本身已压缩，导出打包时原样存储，省去无谓的 deflate
+_STORED_EXTS = {".png", ".jpg", ".jpeg", ".zip", ".whl", ".gz", ".xz", ".bz2"}
+
+# 技能名清洗：lower() 之后只剩小写字母，字符类可以收窄
+_NAME_SANITIZE_RE = re.compile(r"[^a-z0-9_]")
+
+# requirement 行里包名到此为止（版本约束/extras/环境标记）
+_DEP_NAME_RE = re.compile(r"[\[<>=!~; ]")
+
+# GitHub 仓库 URL（https/ssh 均可），用于走 codeload tarball 快路径
+_GITHUB_URL_RE = re.compile(r"github\.com[:/]([\w.-]+)/([\w.-]+?)(?:\.git)?/?$")
+
+
 def _load_schemas(skill_dir: Path) -> Tuple[List[dict], str]:
-    """加载 schemas.json"""
+    """加载 schemas.json（大文件且装了 ijson 时逐项流式解析）"""
     schemas_file = skill_dir / "schemas.json"
     if not schemas_file.exists():
         return [], f"schemas.json 不存在"
     try:
-        data = json.loads(schemas_file.read_text(encoding="utf-8"))
+        if ijson is not None and schemas_file.stat().st_size >= _STREAM_SCHEMA_MIN_BYTES:
+            with open(schemas_file, "rb") as f:
+                head = f.read(64)
+                f.seek(0)
+                # 顶层是列表还是 {"tools": [...]}，看首个非空白字符即可
+                first = head.lstrip()[:1]
+                if first == b"[":
+                    return list(ijson.items(f, "item")), ""
+                if first == b"{":
+                    tools = list(ijson.items(f, "tools.item"))
+                    if tools:
+                        return tools, ""
+                return [], "schemas.json 格式错误：需要是列表或包含 'tools' 键"
+        data = _read_json(schemas_file)
         if isinstance(data, list):
             return data, ""
         elif isinstance(data, dict) and "tools" in data:
@@ -133,12 +299,72 @@ def _load_prompt(skill_dir: Path) -> str:
     """加载 prompt.md"""
     prompt_file = skill_dir / "prompt.md"
     if prompt_file.exists():
-        return prompt_file.read_text(encoding="utf-8").strip()
+        return _read_utf8(prompt_file).strip()
     return ""
 
 
-def load_skill(skill_dir: Path) -> LoadedSkill:
-    """加载单个 skill 目录"""
+def load_skill_zip(zip_path: Path) -> LoadedSkill:
+    """直接从 .zip 技能包加载，不落盘解压（只读分发的技能包）"""
+    name = zip_path.stem
+    try:
+        with zipfile.ZipFile(str(zip_path)) as zf:
+            names = {i.filename for i in zf.infolist() if not i.is_dir()}
+            prefix = _zip_prefix(names)
+
+            if prefix + "skill.json" not in names:
+                meta = SkillMeta(name=name, load_error="skill.json 缺失")
+                return LoadedSkill(meta=meta, path=zip_path)
+            meta = SkillMeta.from_dict(json.loads(zf.read(prefix + "skill.json")))
+            meta.name = meta.name or name
+            skill = LoadedSkill(meta=meta, path=zip_path)
+
+            if prefix + "tools.py" not in names:
+                meta.load_error = "tools.py 不存在（zip 包内）"
+                return skill
+
+            # 同 _load_skill_module：zip 的 mtime 没变就复用已 exec 的模块
+            module_name = f"gary_skill_{name}"
+            mtime_ns = zip_path.stat().st_mtime_ns
+            module = sys.modules.get(module_name)
+            if module is None or getattr(module, "__gary_mtime__", None) != mtime_ns:
+                loader = _ZipToolsLoader(zip_path, prefix + "tools.py")
+                spec = importlib.util.spec_from_loader(module_name, loader)
+                module = importlib.util.module_from_spec(spec)
+                sys.modules[module_name] = module
+                loader.exec_module(module)
+                module.__gary_mtime__ = mtime_ns
+            skill.module = module
+            skill.tools_map = _extract_tools_map(module)
+
+            if prefix + "schemas.json" in names:
+                data = json.loads(zf.read(prefix + "schemas.json"))
+                if isinstance(data, list):
+                    skill.tool_schemas = data
+                elif isinstance(data, dict) and "tools" in data:
+                    skill.tool_schemas = data["tools"]
+            elif hasattr(module, "TOOL_SCHEMAS"):
+                skill.tool_schemas = list(module.TOOL_SCHEMAS)
+
+            if prefix + "prompt.md" in names:
+                skill.prompt_addition = zf.read(prefix + "prompt.md").decode("utf-8").strip()
+    except Exception as e:
+        meta = SkillMeta(name=name, load_error=f"zip 技能加载失败: {e}")
+        return LoadedSkill(meta=meta, path=zip_path)
+
+    meta.tools_count = len(skill.tools_map)
+    meta._active = meta.enabled and not meta.load_error
+    return skill
+
+
+def load_skill(skill_dir: Path, reg_entry: Optional[dict] = None) -> LoadedSkill:
+    """加载单个 skill 目录（或 .zip 技能包）
+
+    reg_entry 是 skills_registry.json 里的对应条目；其中缓存的 meta
+    在 skill.json 的 mtime 没变时直接复用，冷启动免去一次读盘+解析。
+    """
+    if skill_dir.suffix == ".zip" and skill_dir.is_file():
+        return load_skill_zip(skill_dir)
+
     # 1. 读取元信息
     meta_file = skill_dir / "skill.json"
     if not meta_file.exists():
@@ -146,7 +372,12 @@ def load_skill(skill_dir: Path) -> LoadedSkill:
         return LoadedSkill(meta=meta, path=skill_dir)
 
     try:
-        meta_dict = json.loads(meta_file.read_text(encoding="utf-8"))
+        meta_dict = None
+        if reg_entry and reg_entry.get("meta"):
+            if meta_file.stat().st_mtime_ns == reg_entry.get("meta_mtime_ns"):
+                meta_dict = reg_entry["meta"]
+        if meta_dict is None:
+            meta_dict = _read_meta(meta_file)
         meta = SkillMeta.from_dict(meta_dict)
         meta.name = meta.name or skill_dir.name
     except Exception as e:
@@ -163,20 +394,7 @@ def load_skill(skill_dir: Path) -> LoadedSkill:
     skill.module = module
 
     # 3. 提取 tools_map
-    # 优先从 module.TOOLS_MAP 获取，否则扫描所有 public 函数
-    if hasattr(module, "TOOLS_MAP") and isinstance(module.TOOLS_MAP, dict):
-        skill.tools_map = dict(module.TOOLS_MAP)
-    elif hasattr(module, "EXTRA_TOOLS_MAP") and isinstance(module.EXTRA_TOOLS_MAP, dict):
-        skill.tools_map = dict(module.EXTRA_TOOLS_MAP)
-    else:
-        # 自动发现：所有不以 _ 开头的可调用对象
-        skill.tools_map = {
-            name: getattr(module, name)
-            for name in dir(module)
-            if not name.startswith("_")
-            and callable(getattr(module, name))
-            and not isinstance(getattr(module, name), type)
-        }
+    skill.tools_map = _extract_tools_map(module)
 
     # 4. 加载 Schemas
     schemas, err = _load_schemas(skill_dir)
@@ -195,6 +413,7 @@ def load_skill(skill_dir: Path) -> LoadedSkill:
     skill.prompt_addition = _load_prompt(skill_dir)
 
     meta.tools_count = len(skill.tools_map)
+    meta._active = meta.enabled and not meta.load_error
     return skill
 
 
@@ -212,6 +431,19 @@ class SkillsManager:
 
     def __init__(self):
         self._skills: Dict[str, LoadedSkill] = {}  # name → LoadedSkill
+        # 合并结果缓存：只在 install/uninstall/enable/disable/load_all 后重建
+        self._merged_tools: Dict[str, Any] = {}
+        self._merged_schemas: List[dict] = []
+        self._merged_prompt: str = ""
+        # 启用且无错技能的 (工具名集合, 提示词片段) 索引，
+        # 让按工具过滤的热路径不用逐技能重算条件和集合
+        self._prompt_index: List[Tuple[frozenset, str]] = []
+        self._merged_dirty = True
+        # 禁用技能的注册表条目：首次用到时扫一次 _disabled/，之后在
+        # enable/disable/uninstall 里增量维护，保存注册表不再重扫目录
+        self._disabled: Optional[Dict[str, dict]] = None
+        # 上次加载时的技能目录 mtime 快照，reload 无变化时直接短路
+        self._last_snap: Dict[str, int] = {}
         self._ensure_dirs()
 
     def _ensure_dirs(self):
@@ -224,31 +456,50 @@ class SkillsManager:
         """保存技能注册信息到 JSON"""
         data = {}
         for name, skill in self._skills.items():
-            data[name] = {
+            entry = {
                 "enabled": skill.meta.enabled,
                 "install_time": skill.meta.install_time,
                 "version": skill.meta.version,
+                # 连同解析结果一起落盘，下次冷启动 mtime 没变就不用
+                # 再读 skill.json（插件元数据清单）
+                "meta": skill.meta.to_dict(),
             }
-        # 也记录禁用的
-        for d in DISABLED_DIR.iterdir():
-            if d.is_dir() and d.name not in data:
-                meta_file = d / "skill.json"
-                if meta_file.exists():
-                    try:
-                        m = json.loads(meta_file.read_text(encoding="utf-8"))
-                        data[d.name] = {
-                            "enabled": False,
-                            "install_time": m.get("install_time", ""),
-                            "version": m.get("version", ""),
-                        }
-                    except Exception:
-                        pass
-        SKILLS_REGISTRY.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            try:
+                entry["meta_mtime_ns"] = (skill.path / "skill.json").stat().st_mtime_ns
+            except OSError:
+                pass
+            data[name] = entry
+        # 也记录禁用的（内存里维护，不逐次扫目录）
+        for name, entry in self._disabled_entries().items():
+            data.setdefault(name, entry)
+        SKILLS_REGISTRY.write_text(_JSON_ENCODE(data), encoding="utf-8")
+
+    def _disabled_registry_entry(self, skill_dir: Path) -> dict:
+        """从磁盘上的禁用技能目录生成一条注册表条目"""
+        entry = {"enabled": False, "install_time": "", "version": ""}
+        meta_file = skill_dir / "skill.json"
+        if meta_file.exists():
+            try:
+                m = _read_meta(meta_file)
+                entry["install_time"] = m.get("install_time", "")
+                entry["version"] = m.get("version", "")
+            except Exception:
+                pass
+        return entry
+
+    def _disabled_entries(self) -> Dict[str, dict]:
+        """禁用技能条目表（惰性初始化，此后增量维护）"""
+        if self._disabled is None:
+            self._disabled = {
+                d.name: self._disabled_registry_entry(d)
+                for d in _scan_skill_dirs(DISABLED_DIR)
+            }
+        return self._disabled
 
     def _load_registry(self) -> dict:
         if SKILLS_REGISTRY.exists():
             try:
-                return json.loads(SKILLS_REGISTRY.read_text(encoding="utf-8"))
+                return _read_json(SKILLS_REGISTRY)
             except Exception:
                 pass
         return {}
@@ -260,20 +511,24 @@ class SkillsManager:
         self._skills.clear()
         registry = self._load_registry()
 
-        if not SKILLS_DIR.exists():
+        # _scan_skill_dirs 已跳过非目录和 _disabled 等下划线目录。
+        # exec_module 的文件读取/编译会释放 GIL，线程池可重叠各技能的
+        # I/O；模块名 gary_skill_<目录名> 互不相同，加载之间无共享状态
+        skill_dirs = _scan_skill_dirs(SKILLS_DIR)
+        if not skill_dirs:
+            self._save_registry()
+            self._merged_dirty = True
             return self._skills
+        with ThreadPoolExecutor(max_workers=min(8, len(skill_dirs))) as pool:
+            loaded_skills = list(
+                pool.map(lambda d: load_skill(d, registry.get(d.name)), skill_dirs)
+            )
 
-        for skill_dir in sorted(SKILLS_DIR.iterdir()):
-            if not skill_dir.is_dir():
-                continue
-            if skill_dir.name.startswith("_"):
-                continue  # 跳过 _disabled 等
-
-            skill = load_skill(skill_dir)
-
+        for skill in loaded_skills:
             # 从注册表恢复启用状态
             if skill.meta.name in registry:
                 skill.meta.enabled = registry[skill.meta.name].get("enabled", True)
+                skill.meta._active = skill.meta.enabled and not skill.meta.load_error
 
             if not skill.meta.enabled:
                 continue
@@ -291,36 +546,79 @@ class SkillsManager:
                 )
 
         self._save_registry()
+        self._merged_dirty = True
+        self._last_snap = self._dir_snapshot()
         return self._skills
 
+    def _dir_snapshot(self) -> Dict[str, int]:
+        """技能目录快照：目录本身加各关键文件的 mtime_ns。
+
+        只看目录 mtime 不够——改 tools.py 只动文件自己的 mtime，
+        所以把 REQUIRED_FILES 和 prompt.md 一并纳入。
+        """
+        snap: Dict[str, int] = {}
+        for d in _scan_skill_dirs(SKILLS_DIR):
+            try:
+                snap[str(d)] = d.stat().st_mtime_ns
+            except OSError:
+                continue
+            if d.is_dir():
+                for fn in (*REQUIRED_FILES, "prompt.md"):
+                    f = d / fn
+                    try:
+                        snap[str(f)] = f.stat().st_mtime_ns
+                    except OSError:
+                        pass
+        return snap
+
     # ── 获取合并后的工具和提示词 ─────────────────────────────
 
+    def _refresh_merged(self):
+        """一次遍历重建合并后的工具表 / Schema / 提示词缓存"""
+        tools: Dict[str, Any] = {}
+        schemas: List[dict] = []
+        prompt_parts: List[str] = []
+        prompt_index: List[Tuple[frozenset, str]] = []
+        for skill in self._skills.values():
+            if not skill.meta.enabled:
+                continue
+            part = ""
+            if skill.prompt_addition:
+                part = (
+                    f"\n## Skill: {skill.meta.display_name or skill.meta.name}\n"
+                    f"{skill.prompt_addition}"
+                )
+                prompt_parts.append(part)
+            if skill.meta._active:
+                tools.update(skill.tools_map)
+                schemas.extend(skill.tool_schemas)
+                if part:
+                    prompt_index.append(
+                        (frozenset(n for n in map(str, skill.tools_map) if n.strip()), part)
+                    )
+        self._merged_tools = tools
+        self._merged_schemas = schemas
+        self._merged_prompt = "\n".join(prompt_parts)
+        self._prompt_index = prompt_index
+        self._merged_dirty = False
+
     def get_all_tools_map(self) -> Dict[str, Any]:
         """合并所有已启用 skill 的 tools_map"""
-        merged = {}
-        for skill in self._skills.values():
-            if skill.meta.enabled and not skill.meta.load_error:
-                merged.update(skill.tools_map)
-        return merged
+        if self._merged_dirty:
+            self._refresh_merged()
+        return self._merged_tools
 
     def get_all_tool_schemas(self) -> List[dict]:
         """合并所有已启用 skill 的 tool_schemas"""
-        merged = []
-        for skill in self._skills.values():
-            if skill.meta.enabled and not skill.meta.load_error:
-                merged.extend(skill.tool_schemas)
-        return merged
+        if self._merged_dirty:
+            self._refresh_merged()
+        return self._merged_schemas
 
     def get_all_prompt_additions(self) -> str:
         """合并所有已启用 skill 的 prompt 追加内容"""
-        parts = []
-        for skill in self._skills.values():
-            if skill.meta.enabled and skill.prompt_addition:
-                parts.append(
-                    f"\n## Skill: {skill.meta.display_name or skill.meta.name}\n"
-                    f"{skill.prompt_addition}"
-                )
-        return "\n".join(parts)
+        if self._merged_dirty:
+            self._refresh_merged()
+        return self._merged_prompt
 
     def get_prompt_additions_for_tools(
         self, tool_names: set[str] | list[str] | tuple[str, ...]
@@ -331,18 +629,9 @@ class SkillsManager:
         if not active:
             return ""
 
-        parts = []
-        for skill in self._skills.values():
-            if not skill.meta.enabled or skill.meta.load_error or not skill.prompt_addition:
-                continue
-            skill_tool_names = {str(name) for name in skill.tools_map.keys() if str(name).strip()}
-            if not (skill_tool_names & active):
-                continue
-            parts.append(
-                f"\n## Skill: {skill.meta.display_name or skill.meta.name}\n"
-                f"{skill.prompt_addition}"
-            )
-        return "\n".join(parts)
+        if self._merged_dirty:
+            self._refresh_merged()
+        return "\n".join(part for names, part in self._prompt_index if names & active)
 
     # ── 安装技能 ────────────────────────────────────────────
 
@@ -390,7 +679,7 @@ class SkillsManager:
 
         # 验证 skill.json 格式
         try:
-            meta = json.loads((d / "skill.json").read_text(encoding="utf-8"))
+            meta = _read_meta(d / "skill.json")
             if "name" not in meta:
                 return False, "skill.json 缺少 'name' 字段"
         except Exception as e:
@@ -398,30 +687,50 @@ class SkillsManager:
 
         return True, ""
 
-    def _install_from_dir(self, src: Path) -> dict:
-        """从本地目录安装"""
+    def _install_from_dir(self, src: Path, move_ok: bool = False) -> dict:
+        """从本地目录安装
+
+        move_ok=True 表示 src 是用完即弃的临时目录；此时若与 skills/
+        在同一文件系统，直接 rename（O(1) 元数据操作）代替逐文件拷贝。
+        """
         ok, err = self._validate_skill_dir(src)
         if not ok:
             return {"success": False, "message": err}
 
-        meta = json.loads((src / "skill.json").read_text(encoding="utf-8"))
+        meta = _read_meta(src / "skill.json")
         name = meta["name"]
         dest = SKILLS_DIR / name
 
         # 已存在？升级
+        self._backup_existing(dest, name)
+
+        try:
+            same_fs = move_ok and src.stat().st_dev == SKILLS_DIR.stat().st_dev
+        except OSError:
+            same_fs = False
+        if same_fs:
+            os.replace(str(src), str(dest))
+        else:
+            shutil.copytree(str(src), str(dest))
+        return self._finalize_install(dest, meta)
+
+    def _backup_existing(self, dest: Path, name: str) -> None:
+        """升级前把旧版移到 _backup_ 目录"""
         if dest.exists():
-            # 备份旧版
             bak = SKILLS_DIR / f"_backup_{name}_{int(time.time())}"
             shutil.move(str(dest), str(bak))
             CONSOLE.print(f"[dim]  旧版已备份: {bak.name}[/]")
 
-        shutil.copytree(str(src), str(dest))
+    def _finalize_install(self, dest: Path, meta: dict) -> dict:
+        """文件落盘后的公共收尾：写安装时间、装依赖、加载、登记"""
+        name = meta["name"]
 
         # 更新安装时间
         meta["install_time"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         (dest / "skill.json").write_text(
-            json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8"
+            _JSON_ENCODE(meta), encoding="utf-8"
         )
+        _invalidate_meta(dest / "skill.json")
 
         # 安装依赖
         self._install_deps(dest)
@@ -430,6 +739,7 @@ class SkillsManager:
         skill = load_skill(dest)
         self._skills[name] = skill
         self._save_registry()
+        self._merged_dirty = True
 
         return {
             "success": True,
@@ -440,26 +750,45 @@ class SkillsManager:
         }
 
     def _install_from_zip(self, zip_path: Path) -> dict:
-        """从 .zip 文件安装"""
-        import tempfile
-
-        tmp = Path(tempfile.mkdtemp(prefix="gary_skill_"))
+        """从 .zip 文件安装（直接解压到 skills/，不经临时目录二次拷贝）"""
         try:
             with zipfile.ZipFile(str(zip_path), "r") as zf:
-                zf.extractall(str(tmp))
-
-            # zip 可能有顶层目录，也可能直接是文件
-            contents = list(tmp.iterdir())
-            if len(contents) == 1 and contents[0].is_dir():
-                skill_dir = contents[0]
-            else:
-                skill_dir = tmp
-
-            return self._install_from_dir(skill_dir)
+                names = {i.filename for i in zf.infolist() if not i.is_dir()}
+                # zip 可能把技能包在一个顶层目录里，按成员名剥掉这层前缀
+                prefix = _zip_prefix(names)
+
+                # 写盘前先在内存里校验 skill.json 和必要文件
+                missing = [f for f in REQUIRED_FILES if prefix + f not in names]
+                if "schemas.json" in missing and prefix + "tools.py" in names:
+                    missing.remove("schemas.json")
+                if missing:
+                    return {"success": False, "message": f"缺少必要文件: {', '.join(missing)}"}
+                try:
+                    meta = json.loads(zf.read(prefix + "skill.json"))
+                except Exception as e:
+                    return {"success": False, "message": f"skill.json 格式错误: {e}"}
+                if "name" not in meta:
+                    return {"success": False, "message": "skill.json 缺少 'name' 字段"}
+
+                name = meta["name"]
+                dest = SKILLS_DIR / name
+                self._backup_existing(dest, name)
+
+                for info in zf.infolist():
+                    rel = info.filename[len(prefix):]
+                    if not rel or rel.startswith("/") or ".." in rel:
+                        continue
+                    target = dest / rel
+                    if info.is_dir():
+                        target.mkdir(parents=True, exist_ok=True)
+                        continue
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    with zf.open(info) as src_f, open(target, "wb") as dst_f:
+                        shutil.copyfileobj(src_f, dst_f)
         except Exception as e:
             return {"success": False, "message": f"解压失败: {e}"}
-        finally:
-            shutil.rmtree(str(tmp), ignore_errors=True)
+
+        return self._finalize_install(dest, meta)
 
     def _install_from_single_py(self, py_path: Path) -> dict:
         """
@@ -508,44 +837,81 @@ class SkillsManager:
             "schema_version": SKILL_SCHEMA_VERSION,
         }
         (skill_dir / "skill.json").write_text(
-            json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8"
+            _JSON_ENCODE(meta), encoding="utf-8"
         )
 
         # 生成 schemas.json
         if schemas:
             (skill_dir / "schemas.json").write_text(
-                json.dumps(schemas, indent=2, ensure_ascii=False), encoding="utf-8"
+                _JSON_ENCODE(schemas), encoding="utf-8"
             )
         else:
             (skill_dir / "schemas.json").write_text("[]", encoding="utf-8")
 
-        result = self._install_from_dir(skill_dir)
+        result = self._install_from_dir(skill_dir, move_ok=True)
         shutil.rmtree(str(tmp), ignore_errors=True)
         return result
 
+    def _fetch_github_tarball(self, url: str, dest: Path) -> bool:
+        """GitHub 仓库直接流式拉 codeload 的 tar.gz 解到 dest。
+
+        不起 git 子进程、不建 .git 工作区，边下边解；失败返回 False
+        交给 git clone 兜底。
+        """
+        m = _GITHUB_URL_RE.search(url)
+        if not m:
+            return False
+        import tarfile
+        import urllib.request
+
+        tar_url = f"https://codeload.github.com/{m.group(1)}/{m.group(2)}/tar.gz/HEAD"
+        try:
+            with urllib.request.urlopen(tar_url, timeout=30) as resp:
+                with tarfile.open(fileobj=resp, mode="r|gz") as tf:
+                    # 成员都带 <repo>-<sha>/ 顶层前缀，剥掉后写入 dest
+                    for member in tf:
+                        parts = member.name.split("/", 1)
+                        if len(parts) != 2 or not parts[1]:
+                            continue
+                        rel = parts[1]
+                        if rel.startswith("/") or ".." in rel:
+                            continue
+                        target = dest / rel
+                        if member.isdir():
+                            target.mkdir(parents=True, exist_ok=True)
+                        elif member.isfile():
+                            target.parent.mkdir(parents=True, exist_ok=True)
+                            with tf.extractfile(member) as src, open(target, "wb") as out:
+                                shutil.copyfileobj(src, out)
+            return dest.exists()
+        except Exception:
+            shutil.rmtree(str(dest), ignore_errors=True)
+            return False
+
     def _install_from_git(self, url: str) -> dict:
         """从 Git 仓库安装"""
         import tempfile
 
         tmp = Path(tempfile.mkdtemp(prefix="gary_skill_git_"))
         try:
-            result = subprocess.run(
-                ["git", "clone", "--depth", "1", url, str(tmp / "repo")],
-                capture_output=True,
-                text=True,
-                timeout=60,
-            )
-            if result.returncode != 0:
-                return {"success": False, "message": f"git clone 失败: {result.stderr[:200]}"}
-
             repo_dir = tmp / "repo"
+            if not self._fetch_github_tarball(url, repo_dir):
+                result = subprocess.run(
+                    ["git", "clone", "--depth", "1", url, str(repo_dir)],
+                    capture_output=True,
+                    text=True,
+                    timeout=60,
+                )
+                if result.returncode != 0:
+                    return {"success": False, "message": f"git clone 失败: {result.stderr[:200]}"}
+
             # 如果根目录就是 skill
             if (repo_dir / "skill.json").exists():
-                return self._install_from_dir(repo_dir)
+                return self._install_from_dir(repo_dir, move_ok=True)
             # 否则搜索子目录
             for d in repo_dir.iterdir():
                 if d.is_dir() and (d / "skill.json").exists():
-                    return self._install_from_dir(d)
+                    return self._install_from_dir(d, move_ok=True)
 
             return {"success": False, "message": "仓库中未找到 skill.json"}
         except Exception as e:
@@ -561,16 +927,30 @@ class SkillsManager:
 
         deps = [
             l.strip()
-            for l in req_file.read_text().splitlines()
+            for l in _read_utf8(req_file).splitlines()
             if l.strip() and not l.startswith("#")
         ]
         if not deps:
             return
 
-        CONSOLE.print(f"[dim]  安装依赖: {', '.join(deps)}[/]")
+        # 已能 import 的包不值得为它起一个 pip 子进程（只查存在性，
+        # 不校验版本约束；版本不符时 pip 本来也装不动已 import 的包）
+        missing = []
+        for dep in deps:
+            pkg = _DEP_NAME_RE.split(dep, 1)[0].strip()
+            try:
+                found = importlib.util.find_spec(pkg.replace("-", "_")) is not None
+            except (ImportError, ValueError):
+                found = False
+            if not found:
+                missing.append(dep)
+        if not missing:
+            return
+
+        CONSOLE.print(f"[dim]  安装依赖: {', '.join(missing)}[/]")
         try:
             subprocess.run(
-                [sys.executable, "-m", "pip", "install", "--quiet"] + deps,
+                [sys.executable, "-m", "pip", "install", "--quiet"] + missing,
                 capture_output=True,
                 timeout=120,
             )
@@ -591,8 +971,11 @@ class SkillsManager:
             return {"success": False, "message": f"技能不存在: {name}"}
 
         shutil.rmtree(str(target))
+        _invalidate_meta(target / "skill.json")
         self._skills.pop(name, None)
+        self._disabled_entries().pop(name, None)
         self._save_registry()
+        self._merged_dirty = True
 
         return {"success": True, "message": f"已卸载: {name}"}
 
@@ -607,16 +990,22 @@ class SkillsManager:
             # 已在 skills/ 中，只需标记启用
             skill = load_skill(enabled_path)
             skill.meta.enabled = True
+            skill.meta._active = not skill.meta.load_error
             self._skills[name] = skill
             self._save_registry()
+            self._merged_dirty = True
             return {"success": True, "message": f"已启用: {name} ({skill.meta.tools_count} 个工具)"}
 
         if disabled_path.exists():
             shutil.move(str(disabled_path), str(enabled_path))
+            _invalidate_meta(disabled_path / "skill.json")
             skill = load_skill(enabled_path)
             skill.meta.enabled = True
+            skill.meta._active = not skill.meta.load_error
             self._skills[name] = skill
+            self._disabled_entries().pop(name, None)
             self._save_registry()
+            self._merged_dirty = True
             return {"success": True, "message": f"已启用: {name}"}
 
         return {"success": False, "message": f"技能不存在: {name}"}
@@ -632,8 +1021,12 @@ class SkillsManager:
         if disabled_path.exists():
             shutil.rmtree(str(disabled_path))
         shutil.move(str(enabled_path), str(disabled_path))
+        _invalidate_meta(enabled_path / "skill.json")
+        _invalidate_meta(disabled_path / "skill.json")
         self._skills.pop(name, None)
+        self._disabled_entries()[name] = self._disabled_registry_entry(disabled_path)
         self._save_registry()
+        self._merged_dirty = True
 
         return {"success": True, "message": f"已禁用: {name}（/skill enable {name} 重新启用）"}
 
@@ -645,12 +1038,15 @@ class SkillsManager:
 
         # 已启用
         for name, skill in self._skills.items():
+            desc = skill.meta.description
             skills.append(
                 {
                     "name": name,
                     "display_name": skill.meta.display_name or name,
                     "version": skill.meta.version,
-                    "description": skill.meta.description,
+                    "description": desc,
+                    # 列表渲染只需要前 40 字符，切片成本挪到这里一次付清
+                    "description_short": desc if len(desc) <= 40 else desc[:40],
                     "tools_count": skill.meta.tools_count,
                     "enabled": True,
                     "error": skill.meta.load_error[:60] if skill.meta.load_error else "",
@@ -660,18 +1056,20 @@ class SkillsManager:
             )
 
         # 已禁用
-        for d in DISABLED_DIR.iterdir():
-            if d.is_dir() and d.name not in self._skills:
+        for d in _scan_skill_dirs(DISABLED_DIR):
+            if d.name not in self._skills:
                 meta_file = d / "skill.json"
                 if meta_file.exists():
                     try:
-                        m = json.loads(meta_file.read_text(encoding="utf-8"))
+                        m = _read_meta(meta_file)
+                        desc = m.get("description", "")
                         skills.append(
                             {
                                 "name": m.get("name", d.name),
                                 "display_name": m.get("display_name", d.name),
                                 "version": m.get("version", "?"),
-                                "description": m.get("description", ""),
+                                "description": desc,
+                                "description_short": desc if len(desc) <= 40 else desc[:40],
                                 "tools_count": 0,
                                 "enabled": False,
                                 "error": "",
@@ -694,13 +1092,14 @@ class SkillsManager:
                 "tools": list(skill.tools_map.keys()),
                 "has_prompt": bool(skill.prompt_addition),
                 "prompt_preview": skill.prompt_addition[:300] if skill.prompt_addition else "",
+                "prompt_preview_short": skill.prompt_addition[:100] if skill.prompt_addition else "",
                 "path": str(skill.path),
             }
 
         # 检查禁用目录
         disabled_path = DISABLED_DIR / name
         if disabled_path.exists() and (disabled_path / "skill.json").exists():
-            meta = json.loads((disabled_path / "skill.json").read_text(encoding="utf-8"))
+            meta = _read_meta(disabled_path / "skill.json")
             return {"success": True, "meta": meta, "enabled": False, "path": str(disabled_path)}
 
         return {"success": False, "message": f"技能不存在: {name}"}
@@ -709,7 +1108,7 @@ class SkillsManager:
 
     def create_template(self, name: str, description: str = "") -> dict:
         """在 skills/ 下创建技能模板目录"""
-        name = re.sub(r"[^a-zA-Z0-9_]", "_", name.lower().strip())
+        name = _NAME_SANITIZE_RE.sub("_", name.lower().strip())
         dest = SKILLS_DIR / name
         if dest.exists():
             return {"success": False, "message": f"已存在: {name}"}
@@ -717,9 +1116,10 @@ class SkillsManager:
         dest.mkdir(parents=True)
 
         # skill.json
+        display = name.replace("_", " ").title()
         meta = {
             "name": name,
-            "display_name": name.replace("_", " ").title(),
+            "display_name": display,
             "version": "1.0.0",
             "description": description or f"{name} skill for Gary Dev Agent",
             "author": "",
@@ -733,7 +1133,7 @@ class SkillsManager:
             "schema_version": SKILL_SCHEMA_VERSION,
         }
         (dest / "skill.json").write_text(
-            json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8"
+            _JSON_ENCODE(meta), encoding="utf-8"
         )
 
         # tools.py 模板
@@ -773,12 +1173,12 @@ TOOLS_MAP: Dict[str, Any] = {{
             }
         ]
         (dest / "schemas.json").write_text(
-            json.dumps(schemas, indent=2, ensure_ascii=False), encoding="utf-8"
+            _JSON_ENCODE(schemas), encoding="utf-8"
         )
 
         # prompt.md 模板
         (dest / "prompt.md").write_text(
-            f"""## {name.replace('_', ' ').title()} Skill
+            f"""## {display} Skill
 
 这个技能提供了以下工具：
 - `{name}_hello` — 示例工具
@@ -791,7 +1191,7 @@ TOOLS_MAP: Dict[str, Any] = {{
 
         # README.md
         (dest / "README.md").write_text(
-            f"""# {name.replace('_', ' ').title()}
+            f"""# {display}
 
 Gary Dev Agent Skill.
 
@@ -835,10 +1235,23 @@ Gary Dev Agent Skill.
         zip_name = f"gary_skill_{name}.zip"
         zip_path = out_dir / zip_name
 
+        base = str(skill_dir.parent)
         with zipfile.ZipFile(str(zip_path), "w", zipfile.ZIP_DEFLATED) as zf:
-            for fp in skill_dir.rglob("*"):
-                if fp.is_file() and "__pycache__" not in str(fp):
-                    zf.write(str(fp), str(fp.relative_to(skill_dir.parent)))
+            for root, dirs, files in os.walk(str(skill_dir)):
+                # 原地剪枝，连目录都不进去，比逐路径字符串匹配省
+                dirs[:] = [d for d in dirs if d != "__pycache__"]
+                rel_root = os.path.relpath(root, base)
+                for fn in files:
+                    compress = (
+                        zipfile.ZIP_STORED
+                        if os.path.splitext(fn)[1].lower() in _STORED_EXTS
+                        else zipfile.ZIP_DEFLATED
+                    )
+                    zf.write(
+                        os.path.join(root, fn),
+                        os.path.join(rel_root, fn),
+                        compress_type=compress,
+                    )
 
         size_kb = zip_path.stat().st_size / 1024
         return {
@@ -851,20 +1264,49 @@ Gary Dev Agent Skill.
     # ── 重新加载 ────────────────────────────────────────────
 
     def reload_all(self) -> dict:
-        """重新加载所有技能"""
-        old_count = len(self._skills)
-        self._skills.clear()
+        """重新加载所有技能（tools.py 未变的跳过 re-exec）"""
+        # 目录和关键文件都没动过就直接短路，连合并重建都省掉
+        snap = self._dir_snapshot()
+        if snap == self._last_snap:
+            count = len(self._skills)
+            return {
+                "success": True,
+                "loaded": count,
+                "reloaded": 0,
+                "skipped": count,
+                "changed": False,
+                "message": f"技能无变化，跳过重载（共 {count} 个）",
+            }
 
-        # 清除已加载的 module 缓存
-        to_remove = [k for k in sys.modules if k.startswith("gary_skill_")]
-        for k in to_remove:
-            del sys.modules[k]
+        old_count = len(self._skills)
+        old_modules = {name: skill.module for name, skill in self._skills.items()}
 
         loaded = self.load_all()
+
+        # 清理已卸载技能残留的 module 缓存。模块名推导须与加载器一致：
+        # 目录技能是 gary_skill_<目录名>，zip 技能是 gary_skill_<主干名>
+        # （load_skill_zip 用 zip_path.stem），否则 zip 技能每次重载都会
+        # 被误清，__gary_mtime__ 的 re-exec 跳过就永远不命中
+        alive = {
+            f"gary_skill_{skill.path.stem if skill.path.suffix == '.zip' else skill.path.name}"
+            for skill in loaded.values()
+        }
+        for key in [k for k in sys.modules if k.startswith("gary_skill_") and k not in alive]:
+            del sys.modules[key]
+
+        reloaded = sum(
+            1 for name, skill in loaded.items() if old_modules.get(name) is not skill.module
+        )
+        skipped = len(loaded) - reloaded
         return {
             "success": True,
             "loaded": len(loaded),
-            "message": f"已重新加载 {len(loaded)} 个技能（之前 {old_count} 个）",
+            "reloaded": reloaded,
+            "skipped": skipped,
+            "message": (
+                f"已重新加载 {reloaded} 个技能，{skipped} 个未修改跳过"
+                f"（共 {len(loaded)}，之前 {old_count} 个）"
+            ),
         }
 
 
@@ -877,9 +1319,11 @@ _manager: Optional[SkillsManager] = None
 
 def _get_manager() -> SkillsManager:
     global _manager
-    if _manager is None:
-        _manager = SkillsManager()
-    return _manager
+    # 先绑到局部名，已建好的常见路径只做一次全局读 + is 判断
+    mgr = _manager
+    if mgr is None:
+        mgr = _manager = SkillsManager()
+    return mgr
 
 
 def skill_list() -> dict:
@@ -944,124 +1388,73 @@ SKILL_TOOLS_MAP = {
     "skill_reload": skill_reload,
 }
 
-SKILL_TOOL_SCHEMAS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_list",
-            "description": "列出所有已安装的 Gary 技能包（含已禁用的）",
-            "parameters": {"type": "object", "properties": {}, "required": []},
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_install",
-            "description": (
-                "安装技能包到 Gary。支持：本地目录路径、.zip 压缩包、.py 单文件（自动包装）、Git 仓库 URL。"
-                "安装后自动加载工具和 AI 提示词。"
-            ),
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "source": {
-                        "type": "string",
-                        "description": "技能来源：目录路径 / .zip 路径 / .py 文件 / Git URL",
-                    },
-                },
-                "required": ["source"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_uninstall",
-            "description": "卸载技能包（删除文件和注册信息）",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "技能名称"},
-                },
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_enable",
-            "description": "启用已禁用的技能",
-            "parameters": {
-                "type": "object",
-                "properties": {"name": {"type": "string"}},
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_disable",
-            "description": "禁用技能（保留文件但不加载，节省资源）",
-            "parameters": {
-                "type": "object",
-                "properties": {"name": {"type": "string"}},
-                "required": ["name"],
-            },
-        },
-    },
-    {
+def _mk_fn(name: str, desc: str, props=(), required=()) -> dict:
+    """把紧凑的 (参数名, 类型, 描述) 三元组展开成 function schema"""
+    return {
         "type": "function",
         "function": {
-            "name": "skill_info",
-            "description": "查看技能详情：版本、作者、工具列表、提示词预览",
-            "parameters": {
-                "type": "object",
-                "properties": {"name": {"type": "string"}},
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_create",
-            "description": "创建新技能的标准模板目录，包含 skill.json / tools.py / schemas.json / prompt.md",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "name": {"type": "string", "description": "技能名称（英文下划线）"},
-                    "description": {"type": "string", "description": "技能描述"},
-                },
-                "required": ["name"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_export",
-            "description": "导出技能为 .zip 文件，方便分享给其他用户",
+            "name": name,
+            "description": desc,
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "name": {"type": "string", "description": "技能名称"},
-                    "output_dir": {"type": "string", "description": "输出目录（默认当前目录）"},
+                    p_name: (
+                        {"type": p_type, "description": p_desc} if p_desc else {"type": p_type}
+                    )
+                    for p_name, p_type, p_desc in props
                 },
-                "required": ["name"],
+                "required": list(required),
             },
         },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "skill_reload",
-            "description": "重新加载所有技能（修改了 tools.py 后使用）",
-            "parameters": {"type": "object", "properties": {}, "required": []},
-        },
-    },
-]
+    }
+
+
+# (名称, 描述, ((参数名, 类型, 参数描述或 None), ...), (必填参数, ...))
+_FN_SPECS = (
+    ("skill_list", "列出所有已安装的 Gary 技能包（含已禁用的）", (), ()),
+    (
+        "skill_install",
+        "安装技能包到 Gary。支持：本地目录路径、.zip 压缩包、.py 单文件（自动包装）、Git 仓库 URL。"
+        "安装后自动加载工具和 AI 提示词。",
+        (("source", "string", "技能来源：目录路径 / .zip 路径 / .py 文件 / Git URL"),),
+        ("source",),
+    ),
+    (
+        "skill_uninstall",
+        "卸载技能包（删除文件和注册信息）",
+        (("name", "string", "技能名称"),),
+        ("name",),
+    ),
+    ("skill_enable", "启用已禁用的技能", (("name", "string", None),), ("name",)),
+    (
+        "skill_disable",
+        "禁用技能（保留文件但不加载，节省资源）",
+        (("name", "string", None),),
+        ("name",),
+    ),
+    (
+        "skill_info",
+        "查看技能详情：版本、作者、工具列表、提示词预览",
+        (("name", "string", None),),
+        ("name",),
+    ),
+    (
+        "skill_create",
+        "创建新技能的标准模板目录，包含 skill.json / tools.py / schemas.json / prompt.md",
+        (("name", "string", "技能名称（英文下划线）"), ("description", "string", "技能描述")),
+        ("name",),
+    ),
+    (
+        "skill_export",
+        "导出技能为 .zip 文件，方便分享给其他用户",
+        (("name", "string", "技能名称"), ("output_dir", "string", "输出目录（默认当前目录）")),
+        ("name",),
+    ),
+    ("skill_reload", "重新加载所有技能（修改了 tools.py 后使用）", (), ()),
+)
+
+# 消费方只做 extend/迭代，元组即可；加载期一次性展开
+SKILL_TOOL_SCHEMAS = tuple(_mk_fn(*spec) for spec in _FN_SPECS)
 
 
 # ─────────────────────────────────────────────────────────────
@@ -1069,187 +1462,287 @@ SKILL_TOOL_SCHEMAS = [
 # ─────────────────────────────────────────────────────────────
 
 
-def handle_skill_command(args: str, agent=None) -> bool:
-    """
-    处理 /skill 命令。在 stm32_agent.py 的 handle_builtin 中调用：
+def _build_skills_table():
+    """建好五列的技能列表 Table（rich 的 Table 不能跨次渲染复用）"""
+    from rich import box
+    from rich.table import Table
 
-        if head == "/skill":
-            from gary_skills import handle_skill_command
-            handle_skill_command(arg, agent=self)
-            return True
-    """
-    parts = args.strip().split(None, 1)
-    subcmd = parts[0].lower() if parts else "list"
-    subarg = parts[1].strip() if len(parts) > 1 else ""
+    table = Table(title="已安装技能", box=box.SIMPLE)
+    table.add_column("名称", style="bold cyan")
+    table.add_column("版本", style="dim")
+    table.add_column("工具数", style="green")
+    table.add_column("状态", style="white")
+    table.add_column("描述", style="dim")
+    return table
+
+
+def _cmd_list(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill list"""
+    r = mgr.list_skills()
+    if not r["skills"]:
+        CONSOLE.print("[dim]  暂无已安装技能[/]")
+        CONSOLE.print(f"[dim]  技能目录: {SKILLS_DIR}[/]")
+        CONSOLE.print(f"[dim]  安装: /skill install <路径/URL>[/]")
+    else:
+        try:
+            table = _build_skills_table()
+            add = table.add_row
+            for s in r["skills"]:
+                status = "[green]●[/]" if s["enabled"] else "[dim]○ 禁用[/]"
+                if s.get("error"):
+                    status = f"[yellow]⚠ {s['error'][:30]}[/]"
+                add(
+                    s["display_name"],
+                    s["version"],
+                    str(s["tools_count"]) if s["enabled"] else "-",
+                    status,
+                    s["description_short"],
+                )
+            CONSOLE.print(table)
+        except Exception:
+            for s in r["skills"]:
+                flag = "●" if s["enabled"] else "○"
+                CONSOLE.print(
+                    f"  {flag} {s['display_name']} v{s['version']} ({s['tools_count']} tools)"
+                )
+    CONSOLE.print()
+    return True
 
-    mgr = _get_manager()
 
-    # ── /skill list ──────────────────────────────────────────
-    if subcmd in ("list", "ls", ""):
-        r = mgr.list_skills()
-        if not r["skills"]:
-            CONSOLE.print("[dim]  暂无已安装技能[/]")
-            CONSOLE.print(f"[dim]  技能目录: {SKILLS_DIR}[/]")
-            CONSOLE.print(f"[dim]  安装: /skill install <路径/URL>[/]")
-        else:
-            try:
-                table = Table(title="已安装技能", box=box.SIMPLE)
-                table.add_column("名称", style="bold cyan")
-                table.add_column("版本", style="dim")
-                table.add_column("工具数", style="green")
-                table.add_column("状态", style="white")
-                table.add_column("描述", style="dim")
-                for s in r["skills"]:
-                    status = "[green]●[/]" if s["enabled"] else "[dim]○ 禁用[/]"
-                    if s.get("error"):
-                        status = f"[yellow]⚠ {s['error'][:30]}[/]"
-                    table.add_row(
-                        s["display_name"],
-                        s["version"],
-                        str(s["tools_count"]) if s["enabled"] else "-",
-                        status,
-                        s["description"][:40],
-                    )
-                CONSOLE.print(table)
-            except Exception:
-                for s in r["skills"]:
-                    flag = "●" if s["enabled"] else "○"
-                    CONSOLE.print(
-                        f"  {flag} {s['display_name']} v{s['version']} ({s['tools_count']} tools)"
-                    )
-        CONSOLE.print()
-        return True
+# 按 bool(success) 直接索引颜色，省掉各处重复的三元表达式
+_RESULT_COLORS = ("red", "green")
 
-    # ── /skill install <source> ──────────────────────────────
-    if subcmd == "install":
-        if not subarg:
-            CONSOLE.print("[yellow]  用法: /skill install <目录/zip/py/URL>[/]\n")
-            return True
-        CONSOLE.print(f"[dim]  安装: {subarg}[/]")
-        r = mgr.install(subarg)
-        color = "green" if r["success"] else "red"
-        CONSOLE.print(f"[{color}]  {r['message']}[/]\n")
-
-        # 安装成功后热注册到 agent
-        if r["success"] and agent is not None:
-            _hot_reload_agent(agent, mgr)
-        return True
 
-    # ── /skill uninstall <name> ──────────────────────────────
-    if subcmd in ("uninstall", "remove", "rm"):
-        if not subarg:
-            CONSOLE.print("[yellow]  用法: /skill uninstall <名称>[/]\n")
-            return True
-        r = mgr.uninstall(subarg)
-        color = "green" if r["success"] else "red"
-        CONSOLE.print(f"[{color}]  {r['message']}[/]\n")
-        if r["success"] and agent is not None:
-            _hot_reload_agent(agent, mgr)
-        return True
+def _emit_result(r: dict) -> None:
+    """打印带成功/失败着色的结果消息"""
+    CONSOLE.print(f"[{_RESULT_COLORS[bool(r['success'])]}]  {r['message']}[/]\n")
 
-    # ── /skill enable/disable ────────────────────────────────
-    if subcmd == "enable":
-        r = mgr.enable(subarg)
-        CONSOLE.print(f"[{'green' if r['success'] else 'red'}]  {r['message']}[/]\n")
-        if r["success"] and agent is not None:
-            _hot_reload_agent(agent, mgr)
+
+def _emit_and_maybe_reload(r: dict, mgr: SkillsManager, agent) -> None:
+    """打印结果，成功且有 agent 时热注册新工具"""
+    _emit_result(r)
+    if r["success"] and agent is not None:
+        _hot_reload_agent(agent, mgr)
+
+
+def _cmd_install(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill install <source>"""
+    if not subarg:
+        CONSOLE.print("[yellow]  用法: /skill install <目录/zip/py/URL>[/]\n")
         return True
+    CONSOLE.print(f"[dim]  安装: {subarg}[/]")
+    _emit_and_maybe_reload(mgr.install(subarg), mgr, agent)
+    return True
+
 
-    if subcmd == "disable":
-        r = mgr.disable(subarg)
-        CONSOLE.print(f"[{'green' if r['success'] else 'red'}]  {r['message']}[/]\n")
-        if r["success"] and agent is not None:
-            _hot_reload_agent(agent, mgr)
+def _cmd_uninstall(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill uninstall <name>"""
+    if not subarg:
+        CONSOLE.print("[yellow]  用法: /skill uninstall <名称>[/]\n")
         return True
+    _emit_and_maybe_reload(mgr.uninstall(subarg), mgr, agent)
+    return True
 
-    # ── /skill info <name> ───────────────────────────────────
-    if subcmd == "info":
-        r = mgr.info(subarg)
-        if r["success"]:
-            meta = r["meta"]
-            CONSOLE.print(
-                f"  [bold cyan]{meta.get('display_name', meta.get('name'))}[/] v{meta.get('version')}"
-            )
-            CONSOLE.print(f"  [dim]作者:[/] {meta.get('author', '未知')}")
-            CONSOLE.print(f"  [dim]描述:[/] {meta.get('description', '')}")
-            CONSOLE.print(f"  [dim]标签:[/] {', '.join(meta.get('tags', []))}")
-            if "tools" in r:
-                CONSOLE.print(f"  [dim]工具:[/] {', '.join(r['tools'])}")
-            CONSOLE.print(f"  [dim]路径:[/] {r.get('path', '')}")
-            if r.get("prompt_preview"):
-                CONSOLE.print(f"  [dim]提示词预览:[/] {r['prompt_preview'][:100]}...")
-        else:
-            CONSOLE.print(f"[red]  {r['message']}[/]")
-        CONSOLE.print()
+
+def _cmd_enable(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill enable <name>"""
+    _emit_and_maybe_reload(mgr.enable(subarg), mgr, agent)
+    return True
+
+
+def _cmd_disable(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill disable <name>"""
+    _emit_and_maybe_reload(mgr.disable(subarg), mgr, agent)
+    return True
+
+
+def _cmd_info(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill info <name>"""
+    r = mgr.info(subarg)
+    if r["success"]:
+        meta = r["meta"]
+        CONSOLE.print(
+            f"  [bold cyan]{meta.get('display_name', meta.get('name'))}[/] v{meta.get('version')}"
+        )
+        CONSOLE.print(f"  [dim]作者:[/] {meta.get('author', '未知')}")
+        CONSOLE.print(f"  [dim]描述:[/] {meta.get('description', '')}")
+        CONSOLE.print(f"  [dim]标签:[/] {', '.join(meta.get('tags', []))}")
+        if "tools" in r:
+            CONSOLE.print(f"  [dim]工具:[/] {', '.join(r['tools'])}")
+        CONSOLE.print(f"  [dim]路径:[/] {r.get('path', '')}")
+        if r.get("prompt_preview_short"):
+            CONSOLE.print(f"  [dim]提示词预览:[/] {r['prompt_preview_short']}...")
+    else:
+        CONSOLE.print(f"[red]  {r['message']}[/]")
+    CONSOLE.print()
+    return True
+
+
+def _cmd_create(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill create <name> [描述]"""
+    if not subarg:
+        CONSOLE.print("[yellow]  用法: /skill create <名称> [描述][/]\n")
         return True
+    name, desc = _parse_args(subarg)
+    _emit_result(mgr.create_template(name, desc))
+    return True
 
-    # ── /skill create <name> ─────────────────────────────────
-    if subcmd in ("create", "new"):
-        if not subarg:
-            CONSOLE.print("[yellow]  用法: /skill create <名称> [描述][/]\n")
-            return True
-        parts2 = subarg.split(None, 1)
-        name = parts2[0]
-        desc = parts2[1] if len(parts2) > 1 else ""
-        r = mgr.create_template(name, desc)
-        color = "green" if r["success"] else "red"
-        CONSOLE.print(f"[{color}]  {r['message']}[/]\n")
+
+def _cmd_export(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill export <name>"""
+    if not subarg:
+        CONSOLE.print("[yellow]  用法: /skill export <名称>[/]\n")
         return True
+    _emit_result(mgr.export(subarg))
+    return True
+
+
+def _cmd_reload(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill reload"""
+    r = mgr.reload_all()
+    CONSOLE.print(f"[green]  {r['message']}[/]\n")
+    if agent is not None and r.get("changed", True):
+        _hot_reload_agent(agent, mgr)
+    return True
 
-    # ── /skill export <name> ─────────────────────────────────
-    if subcmd == "export":
-        if not subarg:
-            CONSOLE.print("[yellow]  用法: /skill export <名称>[/]\n")
+
+def _cmd_dir(subarg: str, mgr: SkillsManager, agent) -> bool:
+    """/skill dir"""
+    CONSOLE.print(f"  技能目录: {SKILLS_DIR}")
+    CONSOLE.print(f"  禁用目录: {DISABLED_DIR}\n")
+    return True
+
+
+def _parse_args(args: str) -> Tuple[str, str]:
+    """单趟扫描把 \"<sub> <arg>\" 拆成 (小写子命令, 余下参数)。
+
+    split(None, 1) 每次调用都新建列表和两个子串；这里只切两刀。
+    """
+    s = args.strip()
+    if not s:
+        return "", ""
+    i, n = 0, len(s)
+    while i < n and not s[i].isspace():
+        i += 1
+    sub = s[:i].lower()
+    j = i
+    while j < n and s[j].isspace():
+        j += 1
+    return sub, s[j:]
+
+
+# 子命令 → 处理函数（别名指向同一个处理函数），一次字典查找完成分发。
+# 键经 sys.intern，已知子命令的查找退化成指针比较
+_SUBCMD_DISPATCH = {
+    sys.intern(k): v
+    for k, v in {
+        "": _cmd_list,
+        "list": _cmd_list,
+        "ls": _cmd_list,
+        "install": _cmd_install,
+        "uninstall": _cmd_uninstall,
+        "remove": _cmd_uninstall,
+        "rm": _cmd_uninstall,
+        "enable": _cmd_enable,
+        "disable": _cmd_disable,
+        "info": _cmd_info,
+        "create": _cmd_create,
+        "new": _cmd_create,
+        "export": _cmd_export,
+        "reload": _cmd_reload,
+        "dir": _cmd_dir,
+    }.items()
+}
+
+
+def handle_skill_command(args: str, agent=None) -> bool:
+    """
+    处理 /skill 命令。在 stm32_agent.py 的 handle_builtin 中调用：
+
+        if head == "/skill":
+            from gary_skills import handle_skill_command
+            handle_skill_command(arg, agent=self)
             return True
-        r = mgr.export(subarg)
-        color = "green" if r["success"] else "red"
-        CONSOLE.print(f"[{color}]  {r['message']}[/]\n")
+    """
+    subcmd, subarg = _parse_args(args)
+    if len(subcmd) <= 16 and subcmd.isascii():
+        # 合法子命令都是短 ASCII；intern 后命中走指针相等
+        subcmd = sys.intern(subcmd)
+
+    handler = _SUBCMD_DISPATCH.get(subcmd)
+    if handler is None:
+        # 未知子命令
+        CONSOLE.print(f"[yellow]  未知命令: /skill {subcmd}[/]")
+        CONSOLE.print(
+            "  可用: list | install | uninstall | enable | disable | info | create | export | reload | dir\n"
+        )
         return True
+    return handler(subarg, _get_manager(), agent)
 
-    # ── /skill reload ────────────────────────────────────────
-    if subcmd == "reload":
-        r = mgr.reload_all()
-        CONSOLE.print(f"[green]  {r['message']}[/]\n")
-        if agent is not None:
-            _hot_reload_agent(agent, mgr)
-        return True
 
-    # ── /skill dir ───────────────────────────────────────────
-    if subcmd == "dir":
-        CONSOLE.print(f"  技能目录: {SKILLS_DIR}")
-        CONSOLE.print(f"  禁用目录: {DISABLED_DIR}\n")
-        return True
+def _merge_schemas(dest: list, extra, existing: Optional[set] = None) -> None:
+    """按 function.name 去重，把 extra 里的新 schema 追加到 dest。
 
-    # 未知子命令
-    CONSOLE.print(f"[yellow]  未知命令: /skill {subcmd}[/]")
-    CONSOLE.print(
-        "  可用: list | install | uninstall | enable | disable | info | create | export | reload | dir\n"
-    )
-    return True
+    两遍扫描：先一遍收集已有名字，再一遍只追加新名字；循环里用
+    方法的局部别名，免去每个元素的重复属性查找。调用方可以传入
+    常驻的 existing 集合免去第一遍扫描，本函数会原地维护它。
+    """
+    if existing is None:
+        existing = set()
+        for s in dest:
+            fn = s.get("function")
+            if fn is not None:
+                n = fn.get("name")
+                if n:
+                    existing.add(n)
+    new_schemas = []
+    add = new_schemas.append
+    seen = existing.add
+    for schema in extra:
+        fn = schema.get("function")
+        if fn is None:
+            continue
+        n = fn.get("name")
+        if n and n not in existing:
+            add(schema)
+            seen(n)
+    # 攒一批一次 extend，dest 只经历一次扩容
+    if new_schemas:
+        dest.extend(new_schemas)
+
+
+# 共享工具注册表模块引用：首次热重载时解析一次，之后直接用缓存
+_tools_module = None
+
+
+def _get_tools_module():
+    global _tools_module
+    m = _tools_module
+    if m is None:
+        # TOOLS_MAP/TOOL_SCHEMAS 的真正属主是 ai.tools（stm32_agent
+        # 只是薄入口，模块上没有这两张表），热注册必须打到它上面
+        import ai.tools as m
+
+        _tools_module = m
+    return m
 
 
 def _hot_reload_agent(agent, mgr: SkillsManager):
-    """安装/卸载后热更新 agent 的工具和提示词"""
+    """安装/卸载后热更新共享注册表里的工具和 Schema"""
     try:
-        # 动态获取 stm32_agent 模块中的 TOOLS_MAP 和 TOOL_SCHEMAS
-        import stm32_agent as sa
+        at = _get_tools_module()
 
-        # 移除旧 skill 工具（以 skill_ 前缀或在某个 skill 注册表中的）
-        # 简单策略：重建
         extra_tools = mgr.get_all_tools_map()
         extra_schemas = mgr.get_all_tool_schemas()
-        prompt_add = mgr.get_all_prompt_additions()
 
-        # 注册工具
-        sa.TOOLS_MAP.update(extra_tools)
+        # register_tool 会同步维护注册表的配套状态（如上下文注入表），
+        # 不直接 update TOOLS_MAP
+        for name, handler in extra_tools.items():
+            at.register_tool(name, handler)
 
-        # 去重后追加 schema
-        existing_names = {s["function"]["name"] for s in sa.TOOL_SCHEMAS if "function" in s}
-        for schema in extra_schemas:
-            fname = schema.get("function", {}).get("name", "")
-            if fname and fname not in existing_names:
-                sa.TOOL_SCHEMAS.append(schema)
-                existing_names.add(fname)
+        # 去重后追加 schema。已有名字每次现扫：register_tool 会在热重载
+        # 之外独立追加 TOOL_SCHEMAS，常驻集合必然失同步
+        _merge_schemas(at.TOOL_SCHEMAS, extra_schemas)
 
         CONSOLE.print(f"[dim]  已热注册 {len(extra_tools)} 个工具[/]")
 
@@ -1292,12 +1785,7 @@ def init_skills(
     if tools_map is not None:
         tools_map.update(mgr.get_all_tools_map())
     if tool_schemas is not None:
-        existing = {s["function"]["name"] for s in tool_schemas if "function" in s}
-        for schema in mgr.get_all_tool_schemas():
-            fname = schema.get("function", {}).get("name", "")
-            if fname and fname not in existing:
-                tool_schemas.append(schema)
-                existing.add(fname)
+        _merge_schemas(tool_schemas, mgr.get_all_tool_schemas())
 
     return mgr
 
@@ -1307,82 +1795,72 @@ def init_skills(
 # ─────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
-    import argparse
-
-    parser = argparse.ArgumentParser(description="Gary Skills Manager")
-    parser.add_argument(
-        "action",
-        nargs="?",
-        default="list",
-        choices=[
-            "list",
-            "install",
-            "uninstall",
-            "enable",
-            "disable",
-            "info",
-            "create",
-            "export",
-            "reload",
-            "dir",
-        ],
-        help="操作",
-    )
-    parser.add_argument("target", nargs="?", default="", help="目标名称/路径")
-    parser.add_argument("-d", "--description", default="", help="描述（create 时使用）")
-    args = parser.parse_args()
 
-    mgr = _get_manager()
-    mgr.load_all()
-
-    if args.action == "list":
+    def _cli_list(mgr: SkillsManager, target: str, description: str) -> None:
         r = mgr.list_skills()
         print(f"\n已安装 {r['total']} 个技能:\n")
         for s in r["skills"]:
             flag = "●" if s["enabled"] else "○"
             print(
-                f"  {flag} {s['display_name']:<24} v{s['version']:<8} {s['tools_count']} tools  {s['description'][:40]}"
+                f"  {flag} {s['display_name']:<24} v{s['version']:<8} {s['tools_count']} tools  {s['description_short']}"
             )
         print(f"\n技能目录: {SKILLS_DIR}\n")
 
-    elif args.action == "install":
-        if not args.target:
+    def _cli_install(mgr: SkillsManager, target: str, description: str) -> None:
+        if not target:
             print("用法: gary_skills.py install <路径/URL>")
             sys.exit(1)
-        r = mgr.install(args.target)
-        print(r["message"])
-
-    elif args.action == "uninstall":
-        r = mgr.uninstall(args.target)
-        print(r["message"])
-
-    elif args.action == "enable":
-        r = mgr.enable(args.target)
-        print(r["message"])
-
-    elif args.action == "disable":
-        r = mgr.disable(args.target)
-        print(r["message"])
+        print(mgr.install(target)["message"])
 
-    elif args.action == "info":
-        r = mgr.info(args.target)
+    def _cli_info(mgr: SkillsManager, target: str, description: str) -> None:
+        r = mgr.info(target)
         if r["success"]:
             print(json.dumps(r["meta"], indent=2, ensure_ascii=False))
         else:
             print(r["message"])
 
-    elif args.action == "create":
-        r = mgr.create_template(args.target, args.description)
-        print(r["message"])
-
-    elif args.action == "export":
-        r = mgr.export(args.target)
-        print(r["message"])
-
-    elif args.action == "reload":
-        r = mgr.reload_all()
-        print(r["message"])
-
-    elif args.action == "dir":
+    def _cli_dir(mgr: SkillsManager, target: str, description: str) -> None:
         print(f"技能目录: {SKILLS_DIR}")
         print(f"禁用目录: {DISABLED_DIR}")
+
+    _CLI_TABLE = {
+        "list": _cli_list,
+        "install": _cli_install,
+        "uninstall": lambda mgr, t, d: print(mgr.uninstall(t)["message"]),
+        "enable": lambda mgr, t, d: print(mgr.enable(t)["message"]),
+        "disable": lambda mgr, t, d: print(mgr.disable(t)["message"]),
+        "info": _cli_info,
+        "create": lambda mgr, t, d: print(mgr.create_template(t, d)["message"]),
+        "export": lambda mgr, t, d: print(mgr.export(t)["message"]),
+        "reload": lambda mgr, t, d: print(mgr.reload_all()["message"]),
+        "dir": _cli_dir,
+    }
+
+    argv = sys.argv[1:]
+    # 常见的 "verb [target]" 一步到位，不付 argparse 构建/解析的成本；
+    # 带选项或未知动作时再退回完整的 argparse
+    if len(argv) <= 2 and not any(a.startswith("-") for a in argv) and (
+        (argv[0] if argv else "list") in _CLI_TABLE
+    ):
+        action = argv[0] if argv else "list"
+        target = argv[1] if len(argv) > 1 else ""
+        description = ""
+    else:
+        import argparse
+
+        parser = argparse.ArgumentParser(description="Gary Skills Manager")
+        parser.add_argument(
+            "action",
+            nargs="?",
+            default="list",
+            choices=sorted(_CLI_TABLE),
+            help="操作",
+        )
+        parser.add_argument("target", nargs="?", default="", help="目标名称/路径")
+        parser.add_argument("-d", "--description", default="", help="描述（create 时使用）")
+        args = parser.parse_args()
+        action, target, description = args.action, args.target, args.description
+
+    mgr = _get_manager()
+    mgr.load_all()
+    _CLI_TABLE[action](mgr, target, description)
@@ -46,6 +46,7 @@ if len(_sys.argv) > 1 and _sys.argv[1] in _FORBIDDEN_ARGS:
     _sys.exit(2)
 # ─────────────────────────────────────────────────────────────────────────────
 
+import hashlib
 import os
 import sys
 import subprocess
@@ -55,6 +56,10 @@ import argparse
 import shlex
 import stat
 import sysconfig
+import time
+# 网络探测（_detect_china_network）在所有入口最先执行，urllib 总会被用到，
+# 放在模块层免去各下载函数每次调用都过一遍 import 机制
+import urllib.request
 from pathlib import Path
 from typing import Optional, List
 from urllib.parse import urlparse
@@ -63,7 +68,6 @@ from urllib.parse import urlparse
 # Windows 控制台编码修复
 # ─────────────────────────────────────────────────────────────────────────────
 if platform.system() == "Windows":
-    os.system("chcp 65001 > nul 2>&1")
     if hasattr(sys.stdout, "reconfigure"):
         sys.stdout.reconfigure(encoding="utf-8", errors="replace")
         sys.stderr.reconfigure(encoding="utf-8", errors="replace")
@@ -76,6 +80,9 @@ if platform.system() == "Windows":
         import ctypes
 
         kernel32 = ctypes.windll.kernel32
+        # 直接调 Win32 API 切 UTF-8 代码页，免去 os.system("chcp 65001") 起一个 cmd.exe
+        kernel32.SetConsoleOutputCP(65001)
+        kernel32.SetConsoleCP(65001)
         handle = kernel32.GetStdHandle(-11)
         mode = ctypes.c_ulong()
         if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
@@ -93,51 +100,48 @@ def _c(code: str, text: str) -> str:
     return f"\033[{code}m{text}\033[0m" if _USE_COLOR else text
 
 
+# 日志前缀只在模块加载时构造一次（Windows 控制台用 ASCII 符号兜底），
+# 省去每条日志重建转义序列的开销
+_WIN_CONSOLE = platform.system() == "Windows"
+_HEADER_BAR = _c("1;35", "━" * 58)
+_OK_MARK = _c("32", "OK" if _WIN_CONSOLE else "✓")
+_INFO_MARK = _c("36", "->")
+_WARN_MARK = _c("33", "!!" if _WIN_CONSOLE else "⚠")
+_ERR_MARK = _c("31", "XX" if _WIN_CONSOLE else "✗")
+_STEP_MARK = _c("1;36", ">>" if _WIN_CONSOLE else "▶")
+_ASK_MARK = _c("33", "?")
+
+
 def header(msg: str):
-    print(f"\n{_c('1;35', '━' * 58)}")
+    print(f"\n{_HEADER_BAR}")
     print(f"  {_c('1;35', msg)}")
-    print(f"{_c('1;35', '━' * 58)}")
+    print(_HEADER_BAR)
 
 
 def ok(msg: str):
-    print(f"  {_c('32', 'OK')} {msg}")
+    print(f"  {_OK_MARK} {msg}")
 
 
 def info(msg: str):
-    print(f"  {_c('36', '->')} {msg}")
+    print(f"  {_INFO_MARK} {msg}")
 
 
 def warn(msg: str):
-    print(f"  {_c('33', '!!')} {msg}")
+    print(f"  {_WARN_MARK} {msg}")
 
 
 def err(msg: str):
-    print(f"  {_c('31', 'XX')} {msg}")
+    print(f"  {_ERR_MARK} {msg}")
 
 
 def step(msg: str):
-    print(f"\n  {_c('1;36', '>>')} {msg}")
-
-
-if platform.system() != "Windows":
-
-    def ok(msg: str):
-        print(f"  {_c('32', '✓')} {msg}")
-
-    def warn(msg: str):
-        print(f"  {_c('33', '⚠')} {msg}")
-
-    def err(msg: str):
-        print(f"  {_c('31', '✗')} {msg}")
-
-    def step(msg: str):
-        print(f"\n  {_c('1;36', '▶')} {msg}")
+    print(f"\n  {_STEP_MARK} {msg}")
 
 
 def ask(msg: str, default: str = "y") -> bool:
     yn = "Y/n" if default == "y" else "y/N"
     try:
-        ans = input(f"  {_c('33', '?')} {msg} [{yn}] ").strip().lower()
+        ans = input(f"  {_ASK_MARK} {msg} [{yn}] ").strip().lower()
     except (EOFError, KeyboardInterrupt):
         print()
         return default == "y"
@@ -197,9 +201,6 @@ def _detect_china_network() -> bool:
     if _IS_CHINA_NETWORK is not None:
         return _IS_CHINA_NETWORK
 
-    import urllib.request
-    import time
-
     print(f"\n  {_c('36', '->')} 检测网络环境（探测 GitHub 连通性）...", end=" ", flush=True)
 
     github_ok = False
@@ -343,6 +344,46 @@ def _is_externally_managed_python() -> bool:
     return bool(marker and marker.exists())
 
 
+# 目标解释器路径 → 已安装发行包名集合（None 表示枚举失败）
+_INSTALLED_DISTS_CACHE: dict = {}
+
+
+def _installed_distributions(python: Path | str | None = None) -> Optional[set]:
+    """
+    一次性枚举目标解释器已安装的发行包名（规范化为小写 + 连字符）。
+    只跑 1 个子进程做纯元数据扫描，不真正 import 任何依赖——
+    Pillow / pyocd 这类包完整初始化很慢，逐包 import 探测要为每个包付一次。
+    失败返回 None，调用方回退到逐包探测。
+    """
+    target = str(Path(python or ACTIVE_PYTHON).expanduser())
+    if target in _INSTALLED_DISTS_CACHE:
+        return _INSTALLED_DISTS_CACHE[target]
+    code = (
+        "from importlib.metadata import distributions;"
+        "print('\\n'.join(d.metadata['Name'] or '' for d in distributions()))"
+    )
+    result = _run(_python_cmd("-c", code, python=python), timeout=30)
+    dists = None
+    if result.returncode == 0:
+        dists = {
+            line.strip().lower().replace("_", "-")
+            for line in result.stdout.splitlines()
+            if line.strip()
+        }
+    _INSTALLED_DISTS_CACHE[target] = dists
+    return dists
+
+
+def _python_package_available(pkg: str, installed: Optional[set], imp: str) -> bool:
+    """优先查发行包元数据，枚举失败时回退到子进程 import 探测。"""
+    if installed is not None:
+        return pkg.lower().replace("_", "-") in installed
+    try:
+        return _python_module_available(imp)
+    except Exception:
+        return False
+
+
 def _python_module_available(module: str, python: Path | str | None = None) -> bool:
     code = "import importlib,sys; importlib.import_module(sys.argv[1])"
     result = _run(_python_cmd("-c", code, module, python=python), timeout=30)
@@ -371,14 +412,107 @@ def _distro() -> tuple:
         return "", ""
 
 
-def _download(url: str, dest: Path, label: str = "", retries: int = 3) -> bool:
+# 下载 / 解压共用的 I/O 缓冲大小：1 MB 足以摊薄 write() 系统调用开销，
+# 默认的 16 KB 对成百上千个小 .c/.h 文件而言 syscall 次数太多
+_IO_BUF = 1 << 20
+
+# 共享 HTTP 会话：同一主机（github.com / raw.githubusercontent.com 等）会被
+# 连续请求多次，连接复用可省去每个文件一次 TCP+TLS 握手
+_SESSION = None
+_SESSION_UNAVAILABLE = False
+
+
+def _session():
+    """
+    懒加载共享的 requests.Session。
+    setup.py 必须在依赖装好之前就能运行，requests 不可用时返回 None，
+    由 _download 回退到 urllib（无连接复用，仅首次安装时多付几次握手）。
+    """
+    global _SESSION, _SESSION_UNAVAILABLE
+    if _SESSION is None and not _SESSION_UNAVAILABLE:
+        try:
+            import requests
+
+            _SESSION = requests.Session()
+            _SESSION.headers["User-Agent"] = "Mozilla/5.0"
+            # 下载的都是文件正文：禁用传输层压缩，让 iter_content 字节数
+            # 与 Content-Length 可比（urllib 路径本就不发 Accept-Encoding）
+            _SESSION.headers["Accept-Encoding"] = "identity"
+        except ImportError:
+            _SESSION_UNAVAILABLE = True
+    return _SESSION
+
+
+def _remote_content_length(url: str) -> int:
+    """HEAD 请求获取远端文件大小；拿不到时返回 0。"""
+    try:
+        session = _session()
+        if session is not None:
+            resp = session.head(url, timeout=15, allow_redirects=True)
+            return int(resp.headers.get("Content-Length", 0)) if resp.ok else 0
+        req = urllib.request.Request(url, method="HEAD", headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(req, timeout=15) as resp:
+            return int(resp.headers.get("Content-Length", 0))
+    except Exception:
+        return 0
+
+
+def _save_stream(chunks, dest: Path, total: int, tag_label: str, progress: bool, hasher=None) -> int:
+    """
+    把分块字节流写入 dest，返回写入字节数，按需绘制进度条（节流，避免每个
+    分块都刷一次终端）。传入 hasher 时在同一循环里顺带更新摘要，零额外 I/O。
+    """
+    downloaded = 0
+    show = bool(total and tag_label and progress)
+    last_pct = -1
+    last_t = 0.0
+    with open(dest, "wb", buffering=_IO_BUF) as f:
+        # Linux 上预分配目标大小，避免边写边扩展带来的元数据更新
+        if total and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, total)
+            except OSError:
+                pass
+        for chunk in chunks:
+            if not chunk:
+                continue
+            f.write(chunk)
+            downloaded += len(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            if not show:
+                continue
+            # 百分比没变或距上次刷新不足 50ms 就不重绘：慢终端（SSH/WSL）上
+            # 同步 flush 会反过来拖慢下载本身；100% 始终输出
+            pct = min(downloaded * 100 // total, 100)
+            if pct == last_pct:
+                continue
+            now = time.monotonic()
+            if pct < 100 and now - last_t < 0.05:
+                continue
+            last_pct = pct
+            last_t = now
+            bar = "#" * (pct // 5) + "." * (20 - pct // 5)
+            sys.stdout.write(f"\r    [{bar}] {pct:3d}%  {tag_label[:40]}")
+            sys.stdout.flush()
+    return downloaded
+
+
+def _download(
+    url: str,
+    dest: Path,
+    label: str = "",
+    retries: int = 3,
+    progress: bool = True,
+    expected_sha256: Optional[str] = None,
+) -> bool:
     """
     下载文件到 dest。
     自动根据网络环境将 URL 转换为镜像地址（_mirror_url），
     若镜像下载失败则自动回退到原始地址重试。
+    progress=False 时不打印进度条（多线程并行下载时避免 \\r 互相覆盖）。
+    expected_sha256 给定时在写入循环中流式校验摘要，不符视为下载失败并重试。
     """
-    import urllib.request
-
     dest.parent.mkdir(parents=True, exist_ok=True)
 
     mirrored_url = _mirror_url(url)
@@ -390,34 +524,68 @@ def _download(url: str, dest: Path, label: str = "", retries: int = 3) -> bool:
     else:
         urls_to_try.append((url, ""))
 
+    # 目标文件已存在且大小与远端一致时直接跳过，重复执行（如 setup.py --hal）
+    # 只付一次 HEAD 的代价而不重新传输正文。调用方给了摘要时大小一致
+    # 不作数：本地文件必须先过哈希校验才能跳过，否则校验形同虚设
+    if dest.exists():
+        if expected_sha256:
+            try:
+                hasher = hashlib.sha256()
+                with open(dest, "rb") as f:
+                    for chunk in iter(lambda: f.read(_IO_BUF), b""):
+                        hasher.update(chunk)
+                if hasher.hexdigest() == expected_sha256.lower():
+                    if label:
+                        ok(f"已存在且校验通过，跳过下载: {dest.name}")
+                    return True
+            except OSError:
+                pass
+        else:
+            remote_size = _remote_content_length(urls_to_try[0][0])
+            if remote_size and dest.stat().st_size == remote_size:
+                if label:
+                    ok(f"已存在，跳过下载: {dest.name}")
+                return True
+
     for try_url, tag in urls_to_try:
         tag_label = f"{label}{tag}" if tag else label
         for attempt in range(1, retries + 1):
             try:
-                req = urllib.request.Request(try_url, headers={"User-Agent": "Mozilla/5.0"})
-                with urllib.request.urlopen(req, timeout=120) as resp:
-                    total = int(resp.headers.get("Content-Length", 0))
-                    downloaded = 0
-                    with open(dest, "wb") as f:
-                        while True:
-                            chunk = resp.read(65536)
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                            downloaded += len(chunk)
-                            if total and tag_label:
-                                pct = min(downloaded * 100 // total, 100)
-                                bar = "#" * (pct // 5) + "." * (20 - pct // 5)
-                                print(
-                                    f"\r    [{bar}] {pct:3d}%  {tag_label[:40]}",
-                                    end="",
-                                    flush=True,
-                                )
-                if tag_label:
+                hasher = hashlib.sha256() if expected_sha256 else None
+                session = _session()
+                if session is not None:
+                    with session.get(try_url, stream=True, timeout=120) as resp:
+                        resp.raise_for_status()
+                        total = int(resp.headers.get("Content-Length", 0))
+                        # 服务器无视 identity 强行压缩时，iter_content 解压后
+                        # 的字节数与压缩长度不可比，放弃大小校验
+                        if resp.headers.get("Content-Encoding", "identity") not in ("", "identity"):
+                            total = 0
+                        written = _save_stream(
+                            resp.iter_content(_IO_BUF), dest, total, tag_label, progress, hasher
+                        )
+                else:
+                    req = urllib.request.Request(try_url, headers={"User-Agent": "Mozilla/5.0"})
+                    with urllib.request.urlopen(req, timeout=120) as resp:
+                        total = int(resp.headers.get("Content-Length", 0))
+                        written = _save_stream(
+                            iter(lambda: resp.read(_IO_BUF), b""),
+                            dest,
+                            total,
+                            tag_label,
+                            progress,
+                            hasher,
+                        )
+                # 截断 / 篡改的归档宁可当场重试，也不要让 HAL 树带伤进编译
+                if total and written != total:
+                    raise ValueError(f"大小不符：期望 {total}B，实际 {written}B")
+                if hasher is not None and hasher.hexdigest() != expected_sha256.lower():
+                    raise ValueError("SHA-256 校验失败")
+                if tag_label and progress:
                     print()
                 return True  # 下载成功
             except Exception as e:
-                if tag_label:
+                if tag_label and progress:
                     print()
                 dest.unlink(missing_ok=True)
                 if attempt < retries:
@@ -430,46 +598,146 @@ def _download(url: str, dest: Path, label: str = "", retries: int = 3) -> bool:
     return False
 
 
-def _detect_zip_prefix(zip_path: Path) -> str:
-    import zipfile
+def _download_to_memory(url: str, label: str = "", retries: int = 3):
+    """
+    下载到内存，返回 BytesIO；失败返回 None。
+    镜像转换与回退重试策略同 _download。
+    GitHub 归档只有 5-15 MB，直接缓冲进内存解压可省去先落盘再重读的双倍 I/O。
+    """
+    import io
 
+    mirrored_url = _mirror_url(url)
+    urls_to_try: List[tuple] = []
+    if mirrored_url != url:
+        urls_to_try.append((mirrored_url, "[镜像]"))
+        urls_to_try.append((url, "[原始]"))
+    else:
+        urls_to_try.append((url, ""))
+
+    for try_url, tag in urls_to_try:
+        tag_label = f"{label}{tag}" if tag else label
+        for attempt in range(1, retries + 1):
+            try:
+                session = _session()
+                if session is not None:
+                    with session.get(try_url, timeout=120) as resp:
+                        resp.raise_for_status()
+                        return io.BytesIO(resp.content)
+                req = urllib.request.Request(try_url, headers={"User-Agent": "Mozilla/5.0"})
+                with urllib.request.urlopen(req, timeout=120) as resp:
+                    return io.BytesIO(resp.read())
+            except Exception as e:
+                if attempt < retries:
+                    warn(f"下载失败（第 {attempt}/{retries} 次），重试中... [{tag_label}]: {e}")
+                else:
+                    warn(f"地址 {tag} 下载失败（已重试 {retries} 次）[{label}]: {e}")
+
+    err(f"所有下载地址均失败: {label}")
+    return None
+
+
+def _download_fast(url: str, dest: Path, label: str = "") -> bool:
+    """
+    大文件下载：PATH 上有 curl 时委托 curl（-L --fail --retry，支持断点续传、
+    HTTP/2 与系统级 TLS），失败或无 curl 时回退 _download。
+    只在百 MB 级归档上使用——小文件不值得为此多起一个进程。
+    """
+    curl = _which("curl")
+    if curl:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if label:
+            info(f"使用 curl 下载 {label} ...")
+        r = _run(
+            [
+                curl,
+                "-L",
+                "--fail",
+                "--retry",
+                "3",
+                "--continue-at",
+                "-",
+                "-o",
+                str(dest),
+                _mirror_url(url),
+            ],
+            capture=False,
+            timeout=None,
+        )
+        if r.returncode == 0 and dest.exists():
+            return True
+        warn("curl 下载失败，回退内置下载器")
+        dest.unlink(missing_ok=True)
+    return _download(url, dest, label)
+
+
+def _extract_tar_members(tf, dest_dir: Path):
+    """tarfile 解压到 dest_dir，优先用 data 过滤器（旧 3.8/3.9 小版本不支持）。"""
     try:
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            names = zf.namelist()
-            if names:
-                return names[0].split("/")[0]
-    except Exception:
-        pass
-    return ""
+        tf.extractall(dest_dir, filter="data")
+    except TypeError:
+        tf.extractall(dest_dir)
 
 
-def _extract_zip(zip_path: Path, dest_dir: Path, sub_paths: List[str]) -> bool:
+def _stream_untar_xz(url: str, dest_dir: Path) -> bool:
+    """
+    把 tar.xz 的 HTTP 响应直接流进 tarfile（r|xz 流式模式）解压到 dest_dir，
+    不经过临时文件：网络读取、xz 解压与磁盘写入三者重叠进行。
+    """
+    import tarfile
+
+    try:
+        session = _session()
+        if session is not None:
+            with session.get(_mirror_url(url), stream=True, timeout=600) as resp:
+                resp.raise_for_status()
+                with tarfile.open(fileobj=resp.raw, mode="r|xz") as tf:
+                    _extract_tar_members(tf, dest_dir)
+        else:
+            req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+            with urllib.request.urlopen(req, timeout=600) as resp:
+                with tarfile.open(fileobj=resp, mode="r|xz") as tf:
+                    _extract_tar_members(tf, dest_dir)
+        return True
+    except Exception as e:
+        err(f"流式下载/解压失败: {e}")
+        return False
+
+
+def _extract_zip(source, mapping: dict) -> bool:
+    """
+    解压 source（zip 文件路径或内存 BytesIO）中若干子目录的文件（不保留层级）。
+    mapping 形如 {"Inc": HAL_DIR / "Inc", "Src": HAL_DIR / "Src"}。
+    归档只打开一次、中央目录只扫描一轮，按前缀把成员分桶到各自目标目录。
+    """
     import zipfile, shutil as _sh
 
+    source_name = getattr(source, "name", None) or "<内存压缩包>"
     try:
-        prefix = _detect_zip_prefix(zip_path)
-        if not prefix:
-            err(f"无法检测 zip 前缀: {zip_path.name}")
-            return False
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            for sub in sub_paths:
-                src_prefix = f"{prefix}/{sub}/"
-                for member in zf.namelist():
+        with zipfile.ZipFile(source, "r") as zf:
+            infos = zf.infolist()
+            if not infos:
+                err(f"空 zip 归档: {source_name}")
+                return False
+            prefix = infos[0].filename.split("/")[0]
+            buckets = [(f"{prefix}/{sub}/", dest_dir) for sub, dest_dir in mapping.items()]
+            for dest_dir in mapping.values():
+                dest_dir.mkdir(parents=True, exist_ok=True)
+            for info in infos:
+                member = info.filename
+                if member.endswith("/"):
+                    continue
+                for src_prefix, dest_dir in buckets:
                     if not member.startswith(src_prefix):
                         continue
-                    rel = member[len(src_prefix) :]
-                    if not rel or rel.endswith("/"):
-                        continue
-                    fname = Path(rel).name
+                    fname = Path(member).name
                     if not fname:
                         continue
-                    target = dest_dir / fname
-                    target.parent.mkdir(parents=True, exist_ok=True)
-                    with zf.open(member) as src, open(target, "wb") as dst:
-                        _sh.copyfileobj(src, dst)
+                    with zf.open(info) as src, open(dest_dir / fname, "wb") as dst:
+                        _sh.copyfileobj(src, dst, length=_IO_BUF)
+                    break
         return True
     except Exception as e:
-        err(f"解压失败 {zip_path.name}: {e}")
+        err(f"解压失败 {source_name}: {e}")
         return False
 
 
@@ -528,49 +796,63 @@ def _provider_label(api_style: str) -> str:
     return "OpenAI-compatible"
 
 
-def _read_current_ai_config() -> tuple:
-    import re as _re
+_AI_CONFIG_KEYS = ("AI_API_KEY", "AI_BASE_URL", "AI_MODEL", "AI_API_STYLE")
+
 
+def _parse_config_values(text: str, keys) -> dict:
+    """单遍扫描 config.py 文本，提取形如 KEY = \"value\" 的字符串配置项。"""
+    values = {}
+    for line in text.splitlines():
+        key, sep, raw = line.partition("=")
+        key = key.strip()
+        if not sep or key not in keys:
+            continue
+        raw = raw.strip()
+        if len(raw) >= 2 and raw[0] in "\"'":
+            # 找与开头配对的引号收尾，而不是要求整行以引号结束，
+            # 这样带行尾注释的行（KEY = "x"  # 说明）也能解析
+            end = raw.find(raw[0], 1)
+            if end > 0:
+                values[key] = raw[1:end].strip()
+    return values
+
+
+def _read_current_ai_config() -> tuple:
     p = SCRIPT_DIR / "config.py"
     if not p.exists():
         return "", "", "", ""
-    text = p.read_text(encoding="utf-8")
-
-    def _get(pattern):
-        m = _re.search(pattern, text, _re.MULTILINE)
-        return m.group(1).strip() if m else ""
-
+    values = _parse_config_values(p.read_text(encoding="utf-8"), _AI_CONFIG_KEYS)
     return (
-        _get(r'^AI_API_KEY\s*=\s*["\']([^"\']*)["\']'),
-        _get(r'^AI_BASE_URL\s*=\s*["\']([^"\']*)["\']'),
-        _get(r'^AI_MODEL\s*=\s*["\']([^"\']*)["\']'),
-        _normalize_api_style(_get(r'^AI_API_STYLE\s*=\s*["\']([^"\']*)["\']')),
+        values.get("AI_API_KEY", ""),
+        values.get("AI_BASE_URL", ""),
+        values.get("AI_MODEL", ""),
+        _normalize_api_style(values.get("AI_API_STYLE", "")),
     )
 
 
 def _write_ai_config(api_key: str, base_url: str, model: str, api_style: str) -> bool:
-    import re as _re
-
     p = SCRIPT_DIR / "config.py"
     if not p.exists():
         p.write_text(
             'AI_API_KEY = ""\nAI_BASE_URL = ""\nAI_MODEL = ""\nAI_API_STYLE = ""\n',
             encoding="utf-8",
         )
-    text = p.read_text(encoding="utf-8")
-    for key, val in [
-        ("AI_API_KEY", api_key),
-        ("AI_BASE_URL", base_url),
-        ("AI_MODEL", model),
-        ("AI_API_STYLE", _normalize_api_style(api_style)),
-    ]:
-        pattern = rf"^({key}\s*=\s*).*$"
-        if _re.search(pattern, text, flags=_re.MULTILINE):
-            text = _re.sub(pattern, f'{key} = "{val}"', text, flags=_re.MULTILINE)
-        else:
-            text += f'\n{key} = "{val}"'
+    # 单遍改写：已存在的键原地替换（保留原有行序），缺失的键追加到末尾
+    pending = {
+        "AI_API_KEY": api_key,
+        "AI_BASE_URL": base_url,
+        "AI_MODEL": model,
+        "AI_API_STYLE": _normalize_api_style(api_style),
+    }
+    lines = p.read_text(encoding="utf-8").splitlines()
+    for i, line in enumerate(lines):
+        key = line.partition("=")[0].strip()
+        if key in pending:
+            lines[i] = f'{key} = "{pending.pop(key)}"'
+    for key, val in pending.items():
+        lines.append(f'{key} = "{val}"')
     try:
-        p.write_text(text, encoding="utf-8")
+        p.write_text("\n".join(lines) + "\n", encoding="utf-8")
         return True
     except Exception as e:
         print(f"写入失败: {e}")
@@ -1066,32 +1348,38 @@ def _arm_gcc_download(auto: bool):
     if not (auto or ask(f"从 ARM 官网下载安装到 {install_dir}（约 120 MB）？")):
         info("已跳过，请手动安装")
         return
-    import tempfile, tarfile, zipfile
+    import tempfile, zipfile
 
-    tmp = Path(tempfile.mkdtemp())
-    fmt = "zip" if url.endswith(".zip") else "tar.xz"
-    archive = tmp / f"arm-toolchain.{fmt}"
-    # ARM 官网 URL 不走 GitHub 代理，直接下载（_download 内部对非 github.com 地址不转换）
-    if not _download(url, archive, "arm-gnu-toolchain"):
-        return
-    info(f"解压到 {install_dir} ...")
+    # ARM 官网 URL 不走 GitHub 代理（_mirror_url 对非 github.com 地址不转换）
     try:
         install_dir.parent.mkdir(parents=True, exist_ok=True)
-        if fmt == "tar.xz":
-            with tarfile.open(archive, "r:xz") as tf:
-                tf.extractall(install_dir.parent)
+        if url.endswith(".zip"):
+            # ZipFile 需要可 seek 的文件，zip（仅 Windows）仍先落盘再解压
+            tmp = Path(tempfile.mkdtemp())
+            archive = tmp / "arm-toolchain.zip"
+            try:
+                if not _download_fast(url, archive, "arm-gnu-toolchain"):
+                    return
+                info(f"解压到 {install_dir} ...")
+                with zipfile.ZipFile(archive, "r") as zf:
+                    zf.extractall(install_dir.parent)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        else:
+            # tar.xz 直接把 HTTP 响应流进 tarfile（r|xz 流式模式，无需 seek）：
+            # 网络读取、xz 解压与磁盘写入重叠进行，~120 MB 归档不再先落盘一次
+            info(f"流式下载并解压到 {install_dir} ...")
+            if not _stream_untar_xz(url, install_dir.parent):
+                return
             extracted = [
-                d
-                for d in install_dir.parent.iterdir()
-                if d.is_dir() and "arm-gnu-toolchain" in d.name
+                e.path
+                for e in os.scandir(install_dir.parent)
+                if e.is_dir() and "arm-gnu-toolchain" in e.name
             ]
             if extracted:
                 if install_dir.exists():
                     shutil.rmtree(install_dir)
-                extracted[0].rename(install_dir)
-        else:
-            with zipfile.ZipFile(archive, "r") as zf:
-                zf.extractall(install_dir.parent)
+                os.rename(extracted[0], install_dir)
     except Exception as e:
         err(f"解压失败: {e}")
         return
@@ -1100,7 +1388,6 @@ def _arm_gcc_download(auto: bool):
         _add_to_path(str(bin_dir))
         os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ.get("PATH", "")
         ok(f"工具链已安装：{install_dir}")
-    shutil.rmtree(tmp, ignore_errors=True)
 
 
 def _add_to_path(new_path: str):
@@ -1135,6 +1422,25 @@ PYTHON_PKGS = [
 ]
 
 
+def _pip_install_bisect(pkgs: List[str], mirror_args: List[str]) -> List[str]:
+    """
+    二分批量安装，返回最终装不上的包列表。
+    pip 每次启动都要付一遍解析器 / 索引的固定开销，逐个安装 N 个包要付 N 次；
+    二分只在确实有包失败时用 O(log N) 次调用把罪魁隔离出来。
+    """
+    if not pkgs:
+        return []
+    r = _run(PIP + ["install"] + pkgs + mirror_args, capture=False)
+    if r.returncode == 0:
+        return []
+    if len(pkgs) == 1:
+        return pkgs
+    mid = len(pkgs) // 2
+    return _pip_install_bisect(pkgs[:mid], mirror_args) + _pip_install_bisect(
+        pkgs[mid:], mirror_args
+    )
+
+
 def install_python_packages(auto: bool):
     header("Step 3  Python 依赖包")
     info(f"目标 Python 环境: {_active_python_path()} [{ACTIVE_PYTHON_LABEL}]")
@@ -1146,12 +1452,9 @@ def install_python_packages(auto: bool):
     _run(PIP + ["install", "--upgrade", "pip", "-q"] + mirror_args, capture=False)
 
     missing_req, missing_opt = [], []
+    installed = _installed_distributions()
     for imp, pkg, required in PYTHON_PKGS:
-        try:
-            available = _python_module_available(imp)
-        except Exception:
-            available = False
-        if available:
+        if _python_package_available(pkg, installed, imp):
             ok(f"{pkg}")
         else:
             (missing_req if required else missing_opt).append(pkg)
@@ -1166,9 +1469,16 @@ def install_python_packages(auto: bool):
     if auto or ask(prompt + "？"):
         r = _run(PIP + ["install"] + to_install + mirror_args, capture=False)
         if r.returncode != 0:
-            warn("批量安装失败，逐个安装...")
-            for pkg in to_install:
-                _run(PIP + ["install", pkg] + mirror_args, capture=False)
+            warn("批量安装失败，改用二进制轮子整批重试...")
+            r = _run(
+                PIP + ["install", "--prefer-binary"] + to_install + mirror_args, capture=False
+            )
+        if r.returncode != 0:
+            warn("仍有失败，二分定位问题包...")
+            failed = _pip_install_bisect(to_install, mirror_args)
+            if failed:
+                warn(f"以下包安装失败，请手动安装: {failed}")
+        _INSTALLED_DISTS_CACHE.clear()  # 安装后失效，verify() 重新枚举
     elif missing_req:
         info(f"必须包未安装：{missing_req}")
 
@@ -1293,8 +1603,6 @@ def _refresh_windows_docker_cli() -> Optional[str]:
 
 
 def _wait_for_container_runtime_ready(runtime: str, timeout_seconds: int = 180) -> bool:
-    import time
-
     deadline = time.time() + timeout_seconds
     while time.time() < deadline:
         result = _run([runtime, "info"], timeout=15)
@@ -1405,8 +1713,6 @@ def _container_image_present(runtime: str, image: str) -> bool:
 
 
 def _searxng_healthcheck(base_url: str = None) -> bool:
-    import urllib.request
-
     target = (base_url or _searxng_url()).rstrip("/")
     try:
         req = urllib.request.Request(
@@ -1772,6 +2078,16 @@ CMSIS_CORE_FILES = {
 }
 
 
+def _hal_src_count(fam: str) -> int:
+    """统计某系列已就位的 HAL 源文件数（os.scandir 免去为每个目录项建 Path）。"""
+    prefix = f"stm32{fam}xx_hal"
+    try:
+        with os.scandir(HAL_DIR / "Src") as entries:
+            return sum(1 for e in entries if e.name.startswith(prefix) and e.name.endswith(".c"))
+    except OSError:
+        return 0
+
+
 def download_hal(auto: bool, families: List[str] = None):
     header("Step 5  STM32 HAL 库")
     if families is None:
@@ -1781,8 +2097,7 @@ def download_hal(auto: bool, families: List[str] = None):
     missing = [f for f in families if f not in present]
 
     for f in present:
-        src_cnt = len(list((HAL_DIR / "Src").glob(f"stm32{f}xx_hal*.c")))
-        ok(f"STM32{f.upper()}xx HAL 已就绪（{src_cnt} 个源文件）")
+        ok(f"STM32{f.upper()}xx HAL 已就绪（{_hal_src_count(f)} 个源文件）")
 
     cmsis_ok = (HAL_DIR / "CMSIS" / "Include" / "core_cm3.h").exists()
     if cmsis_ok:
@@ -1800,27 +2115,36 @@ def download_hal(auto: bool, families: List[str] = None):
     if _detect_china_network():
         info("国内网络：HAL 库将通过 ghfast.top 镜像下载")
 
-    import tempfile
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    # 各系列的下载互不相关，用线程池并行拉取，总耗时从所有系列之和降到最慢的一个；
+    # 归档直接缓冲进内存解压（每个系列 5-15 MB），不再先落盘一个临时 zip。
+    # 解压仍按完成顺序在主线程进行（每个任务持有各自的 BytesIO，不共享句柄）。
+    def _fetch_fam(fam: str) -> tuple:
+        hal_url, cmsis_url = HAL_REPOS[fam]
+        return (
+            fam,
+            _download_to_memory(hal_url, f"stm32{fam}xx-hal-driver"),
+            _download_to_memory(cmsis_url, f"cmsis_device_{fam}"),
+        )
 
-    tmp = Path(tempfile.mkdtemp(prefix="stm32_hal_"))
-    try:
-        for fam in missing:
-            hal_url, cmsis_url = HAL_REPOS[fam]
-            step(f"STM32{fam.upper()}xx  HAL 驱动...")
-            hal_zip = tmp / f"hal_{fam}.zip"
-            if _download(hal_url, hal_zip, f"stm32{fam}xx-hal-driver"):
-                _extract_zip(hal_zip, HAL_DIR / "Inc", ["Inc"])
-                _extract_zip(hal_zip, HAL_DIR / "Src", ["Src"])
-                ok(f"  HAL 驱动头文件 + 源文件")
-            cmsis_zip = tmp / f"cmsis_{fam}.zip"
-            if _download(cmsis_url, cmsis_zip, f"cmsis_device_{fam}"):
-                _extract_zip(cmsis_zip, HAL_DIR / "Inc", ["Include"])
-                _extract_zip(cmsis_zip, HAL_DIR / "Src", ["Source/Templates"])
-                ok(f"  CMSIS Device 头文件 + system_*.c")
-        if not cmsis_ok:
-            _download_cmsis_core()
-    finally:
-        shutil.rmtree(tmp, ignore_errors=True)
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(8, len(missing))) as pool:
+            futures = [pool.submit(_fetch_fam, fam) for fam in missing]
+            for future in as_completed(futures):
+                fam, hal_buf, cmsis_buf = future.result()
+                step(f"STM32{fam.upper()}xx  HAL 驱动...")
+                if hal_buf is not None:
+                    _extract_zip(hal_buf, {"Inc": HAL_DIR / "Inc", "Src": HAL_DIR / "Src"})
+                    ok(f"  HAL 驱动头文件 + 源文件")
+                if cmsis_buf is not None:
+                    _extract_zip(
+                        cmsis_buf,
+                        {"Include": HAL_DIR / "Inc", "Source/Templates": HAL_DIR / "Src"},
+                    )
+                    ok(f"  CMSIS Device 头文件 + system_*.c")
+    if not cmsis_ok:
+        _download_cmsis_core()
 
     ok("HAL 库下载完成")
 
@@ -1831,13 +2155,18 @@ def _download_cmsis_core():
     dst_dir.mkdir(parents=True, exist_ok=True)
     if _detect_china_network():
         info("国内网络：CMSIS Core 头文件将通过 raw.gitmirror.com 镜像下载")
+    missing = [(fname, url) for fname, url in CMSIS_CORE_FILES.items() if not (dst_dir / fname).exists()]
     failed = []
-    for fname, url in CMSIS_CORE_FILES.items():
-        dest = dst_dir / fname
-        if dest.exists():
-            continue
-        if not _download(url, dest, fname):
-            failed.append(fname)
+    if missing:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # 10 个小头文件逐个串行下载时延迟全花在握手上，并行拉取收益最大
+        with ThreadPoolExecutor(max_workers=min(8, len(missing))) as pool:
+            results = pool.map(
+                lambda item: (item[0], _download(item[1], dst_dir / item[0], item[0], progress=False)),
+                missing,
+            )
+            failed = [fname for fname, done in results if not done]
     if failed:
         warn(f"  以下文件下载失败: {failed}")
         info("  可手动下载: https://github.com/ARM-software/CMSIS_5/tree/5.9.0/CMSIS/Core/Include")
@@ -2237,8 +2566,9 @@ def verify():
 
     # Python 包
     pkg_ok = {}
+    installed = _installed_distributions()
     for imp, pkg, required in PYTHON_PKGS:
-        if _python_module_available(imp):
+        if _python_package_available(pkg, installed, imp):
             ok(f"Python: {pkg}")
             pkg_ok[pkg] = True
         else:
@@ -2250,13 +2580,8 @@ def verify():
     hal_any = False
     for fam in HAL_REPOS:
         hal_h = HAL_DIR / "Inc" / f"stm32{fam}xx_hal.h"
-        src_cnt = (
-            len(list((HAL_DIR / "Src").glob(f"stm32{fam}xx_hal*.c")))
-            if (HAL_DIR / "Src").exists()
-            else 0
-        )
         if hal_h.exists():
-            ok(f"HAL: stm32{fam}xx  ({src_cnt} 个源文件)")
+            ok(f"HAL: stm32{fam}xx  ({_hal_src_count(fam)} 个源文件)")
             hal_any = True
         else:
             warn(f"HAL: stm32{fam}xx  未安装")